@@ -0,0 +1,241 @@
+"""Benchmarks of the casino hot paths.
+
+Every game is played from the bet checks of check_conditions to the payout of
+game_teardown, against the in memory Config and bank of fakes.py, and writes its session
+and audit records to a temporary folder. The games are answered by a scripted player and
+their pauses only yield, so the numbers are the cost of the code alone. Run from the root
+of the repository:
+
+    python benchmarks/bench_casino.py [-n 2000] [-k pikapokeri]
+
+For every benchmark this prints the operations per second, the time per operation and,
+measured in a second pass under tracemalloc, the peak bytes allocated by one operation
+and the bytes it leaves allocated.
+"""
+
+# Standard Library
+import argparse
+import asyncio
+import datetime
+import gc
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes  # noqa: E402
+
+fakes.install()
+
+# Casino
+from casino import games, utils  # noqa: E402
+from casino.audit import audit  # noqa: E402
+from casino.casino import Casino  # noqa: E402
+from casino.data import Database  # noqa: E402
+from casino.deck import Deck  # noqa: E402
+from casino.rng import rng  # noqa: E402
+from casino.sessions import sessions  # noqa: E402
+
+# Third-Party Libraries
+from tabulate import tabulate  # noqa: E402
+
+SEED = 1492
+PLAYERS = 1000
+
+
+class Table:
+    """A guild with one player, whose every bet passes the casino's checks."""
+
+    def __init__(self):
+        self.bot = fakes.Bot()
+        self.guild = fakes.Guild(10)
+        self.channel = fakes.Channel(20, self.guild)
+        self.player = fakes.Member(30, self.guild)
+
+    async def open(self):
+        group = await Database().get_data(self.ctx())
+        async with group.Games() as settings:
+            for game in settings.values():
+                game["Cooldown"] = 0
+
+    def ctx(self, *replies):
+        return fakes.Context(self.bot, self.player, self.channel, replies)
+
+
+def game_cases(table):
+    core, blackjack, war = games.Core(), games.Blackjack(), games.War()
+    double, pikapokeri = games.Double(), games.Pikapokeri()
+    return [
+        ("allin", lambda: core.play_allin(table.ctx(), 10, 2)),
+        ("coin", lambda: core.play_coin(table.ctx(), 10, "heads")),
+        ("cups", lambda: core.play_cups(table.ctx(), 25, "1")),
+        ("dice", lambda: core.play_dice(table.ctx(), 25)),
+        ("hilo", lambda: core.play_hilo(table.ctx(), 25, "low")),
+        ("craps", lambda: core.play_craps(table.ctx(), 50)),
+        ("blackjack", lambda: blackjack.play(table.ctx("stay"), 50)),
+        ("war", lambda: war.play(table.ctx("war"), 25)),
+        ("double", lambda: double.play(table.ctx("double", "cash out"), 10)),
+        ("pikapokeri", lambda: pikapokeri.play(table.ctx("1", "2"), 10)),
+        ("pikapokeri batch x100", lambda: pikapokeri.play_batch(table.ctx(), 10, 100,
+                                                                  "best", 0)),
+    ]
+
+
+def membership_case(table):
+    """Casino.update_players over PLAYERS members, with nothing changed since the last pass
+    (warm) and with every player qualified again (cold)."""
+    cog = Casino.__new__(Casino)
+    cog.fingerprints = {}
+    guild = table.guild
+    guild.roles = [fakes.Snowflake(x, "Role{}".format(x)) for x in range(3)]
+    memberships = {
+        name: {"Access": access, "Bonus": 1, "Color": "grey", "Credits": credits,
+               "Role": role, "DOS": dos, "Reduction": 0}
+        for name, access, credits, role, dos in (("Bronze", 1, 1000, None, 0),
+                                                 ("Silver", 2, 5000, "Role1", 30),
+                                                 ("Gold", 3, 50000, "Role2", 365))
+    }
+    joined = datetime.datetime.now() - datetime.timedelta(days=400)
+    players = [(fakes.Member(1000 + x, guild, guild.roles[:x % 4], joined), dict(
+        Membership={"Name": "Basic", "Assigned": False})) for x in range(PLAYERS)]
+
+    async def warm():
+        await cog.update_players(guild.id, memberships, players, guild=guild)
+
+    async def cold():
+        cog.fingerprints.clear()
+        await cog.update_players(guild.id, memberships, players, guild=guild)
+
+    return [("update_players x{} warm".format(PLAYERS), warm),
+            ("update_players x{} cold".format(PLAYERS), cold)]
+
+
+def unit_cases():
+    deck = Deck(rng.stream("Bench"))
+    hand = deck.deal(num=5)
+    blackjack = [Deck.card(":hearts:", "Ace"), Deck.card(":spades:", 6),
+                 Deck.card(":clubs:", "King")]
+    pikapokeri = games.Pikapokeri()
+
+    def deal():
+        deck.new()
+        deck.deal(num=5)
+
+    return [
+        ("Deck.new", deck.new),
+        ("Deck.new + deal(5)", deal),
+        ("Deck.bj_count", lambda: Deck.bj_count(blackjack)),
+        ("utils.time_formatter", lambda: utils.time_formatter(3725)),
+    ], [
+        ("Pikapokeri.check_hand", lambda: pikapokeri.check_hand(hand)),
+    ]
+
+
+def calls(call):
+    """Adapts a function for measure."""
+    async def run(number):
+        for x in range(number):
+            call()
+    return run
+
+
+def awaits(call):
+    """Adapts a function returning an awaitable for measure."""
+    async def run(number):
+        for x in range(number):
+            await call()
+    return run
+
+
+async def measure(run, number):
+    """Returns the seconds per call, and the peak and kept bytes allocated by one call.
+
+    run is a call adapted by calls or awaits, so the timed loop has no per call overhead
+    of its own.
+    """
+    await run(min(number, 100))
+    start = time.perf_counter()
+    await run(number)
+    elapsed = (time.perf_counter() - start) / number
+
+    gc.collect()
+    tracemalloc.start()
+    samples = min(number, 200)
+    peak = kept = 0
+    for x in range(samples):
+        # Created before the traces are cleared, so the coroutine itself is not counted.
+        step = run(1)
+        tracemalloc.clear_traces()
+        await step
+        current, high = tracemalloc.get_traced_memory()
+        peak += high
+        kept += current
+    tracemalloc.stop()
+    return elapsed, peak / samples, kept / samples
+
+
+def row(name, result):
+    elapsed, peak, kept = result
+    return name, "{:,.0f}".format(1 / elapsed), "{:,.2f}".format(elapsed * 1e6), \
+        "{:,.0f}".format(peak), "{:,.0f}".format(kept)
+
+
+async def run(number, keyword):
+    # Every game writes to the session and audit logs, as it does in the bot.
+    with tempfile.TemporaryDirectory() as folder:
+        sessions.attach(os.path.join(folder, "sessions"))
+        audit.attach(pathlib.Path(folder, "audit"))
+        try:
+            return await play(number, keyword)
+        finally:
+            sessions.detach()
+            audit.detach()
+
+
+async def play(number, keyword):
+    rng.configure(seed=SEED)
+    fakes.scale_pauses(games)
+    table = Table()
+    await table.open()
+
+    def wanted(name):
+        return keyword is None or keyword.lower() in name.lower()
+
+    sync, coros = unit_cases()
+    rows = []
+    for name, call in sync:
+        if wanted(name):
+            rows.append(row(name, await measure(calls(call), number * 50)))
+    for name, call in coros:
+        if wanted(name):
+            rows.append(row(name, await measure(awaits(call), number * 50)))
+    for name, call in game_cases(table):
+        name = "game: " + name
+        if wanted(name):
+            rows.append(row(name, await measure(awaits(call), number)))
+    for name, call in membership_case(table):
+        if wanted(name):
+            rows.append(row(name, await measure(awaits(call), max(1, number // 100))))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--number", type=int, default=2000,
+                        help="Games played per game benchmark. Unit benchmarks run 50 times "
+                             "as many operations, update_players a hundredth.")
+    parser.add_argument("-k", "--keyword", help="Only run benchmarks whose name contains it.")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args.number, args.keyword))
+    print(tabulate(rows, headers=("Benchmark", "ops/sec", "us/op", "peak B/op", "kept B/op"),
+                   colalign=("left", "right", "right", "right", "right")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,569 @@
+"""In memory stand-ins for Red's Config and bank, and for the Discord objects a command
+sees, so cogs can be benchmarked and load tested without a bot, a data directory or a
+connection.
+
+install must be called before any cog is imported, because the cogs bind Config when
+their modules load:
+
+    import fakes
+    fakes.install()
+    from casino.games import Core
+
+Red-DiscordBot and discord.py still have to be installed; only Config and bank are
+replaced. Every Config and bank call is counted in meter, and can be given latency:
+
+    fakes.meter.latency["Config"] = 0.002
+"""
+
+# Standard Library
+import asyncio
+import datetime
+import itertools
+import json
+import types
+from collections import Counter, deque
+from copy import deepcopy
+
+_ids = itertools.count(1 << 40)
+
+BANK_FUNCTIONS = ("get_balance", "set_balance", "can_spend", "withdraw_credits",
+                  "deposit_credits", "transfer_credits", "get_currency_name", "is_global")
+
+
+class Meter:
+    """Counts the calls made to the fake backends, and delays them.
+
+    Calls are counted by name, such as Config.get or bank.withdraw_credits. latency maps
+    a backend, Config or bank, to the seconds each of its calls waits before returning.
+    Without latency a call returns without suspending, like Config's JSON driver.
+    """
+
+    __slots__ = ('latency', 'calls')
+
+    def __init__(self):
+        self.latency = {}
+        self.calls = Counter()
+
+    async def __call__(self, name):
+        self.calls[name] += 1
+        delay = self.latency.get(name.partition(".")[0])
+        if delay:
+            await asyncio.sleep(delay)
+
+    def reset(self):
+        self.calls.clear()
+
+
+meter = Meter()
+
+
+def _merge(defaults, data):
+    merged = deepcopy(defaults)
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = deepcopy(value)
+    return merged
+
+
+class _Value:
+    """What calling a Group returns: awaitable, or used with async with to edit in place."""
+
+    __slots__ = ('group', 'value')
+
+    def __init__(self, group):
+        self.group = group
+        self.value = None
+
+    def __await__(self):
+        return self.group._get().__await__()
+
+    async def __aenter__(self):
+        self.value = await self.group._get()
+        return self.value
+
+    async def __aexit__(self, *exc):
+        await self.group.set(self.value)
+
+
+class Group:
+    """A path into the data of one Config scope, such as a guild or a member."""
+
+    __slots__ = ('_config', '_scope', '_path')
+
+    def __init__(self, config, scope, path=()):
+        self._config = config
+        self._scope = scope
+        self._path = path
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return Group(self._config, self._scope, self._path + (item,))
+
+    def __call__(self, default=None):
+        return _Value(self)
+
+    def _defaults(self):
+        defaults = self._config.defaults[self._scope[0]]
+        for part in self._path:
+            if not isinstance(defaults, dict):
+                return None
+            defaults = defaults.get(part)
+        return defaults
+
+    async def _get(self):
+        await meter("Config.get")
+        node = self._config.data.get(self._scope, {})
+        for part in self._path:
+            if not isinstance(node, dict) or part not in node:
+                node = None
+                break
+            node = node[part]
+        defaults = self._defaults()
+        if isinstance(defaults, dict):
+            return _merge(defaults, node if isinstance(node, dict) else {})
+        return deepcopy(defaults if node is None else node)
+
+    async def all(self):
+        return await self._get()
+
+    async def set(self, value):
+        await meter("Config.set")
+        # Round trip through JSON like Config's JSON driver, which turns keys into strings.
+        value = json.loads(json.dumps(value))
+        if not self._path:
+            self._config.data[self._scope] = value
+            return
+        node = self._config.data.setdefault(self._scope, {})
+        for part in self._path[:-1]:
+            node = node.setdefault(part, {})
+        node[self._path[-1]] = value
+
+    async def clear(self):
+        await meter("Config.clear")
+        if not self._path:
+            self._config.data.pop(self._scope, None)
+            return
+        node = self._config.data.get(self._scope, {})
+        for part in self._path[:-1]:
+            node = node.get(part)
+            if not isinstance(node, dict):
+                return
+        node.pop(self._path[-1], None)
+
+    def _raw(self, keys):
+        return Group(self._config, self._scope, self._path + tuple(str(x) for x in keys))
+
+    async def get_raw(self, *keys, default=None):
+        value = await self._raw(keys)._get()
+        return default if value is None else value
+
+    async def set_raw(self, *keys, value):
+        await self._raw(keys).set(value)
+
+    async def clear_raw(self, *keys):
+        await self._raw(keys).clear()
+
+
+class Config:
+    """The parts of redbot.core.Config the cogs use, kept in a dictionary.
+
+    Data is stored as JSON would hold it, keyed by (category, *ids), and merged with the
+    registered defaults when read, the same as Config. Every get_conf call with the same
+    identifier returns the same instance.
+    """
+
+    _instances = {}
+
+    def __init__(self, identifier):
+        self.identifier = identifier
+        self.data = {}
+        self.defaults = {"GLOBAL": {}, "GUILD": {}, "MEMBER": {}, "USER": {}}
+
+    @classmethod
+    def get_conf(cls, cog_instance, identifier, force_registration=False, cog_name=None):
+        try:
+            return cls._instances[identifier]
+        except KeyError:
+            config = cls._instances[identifier] = cls(identifier)
+            return config
+
+    def register_global(self, **defaults):
+        self.defaults["GLOBAL"].update(defaults)
+
+    def register_guild(self, **defaults):
+        self.defaults["GUILD"].update(defaults)
+
+    def register_member(self, **defaults):
+        self.defaults["MEMBER"].update(defaults)
+
+    def register_user(self, **defaults):
+        self.defaults["USER"].update(defaults)
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return getattr(Group(self, ("GLOBAL",)), item)
+
+    async def all(self):
+        return await Group(self, ("GLOBAL",)).all()
+
+    def guild(self, guild):
+        return self.guild_from_id(guild.id)
+
+    def guild_from_id(self, guild_id):
+        return Group(self, ("GUILD", guild_id))
+
+    def member(self, member):
+        return self.member_from_ids(member.guild.id, member.id)
+
+    def member_from_ids(self, guild_id, member_id):
+        return Group(self, ("MEMBER", guild_id, member_id))
+
+    def user(self, user):
+        return self.user_from_id(user.id)
+
+    def user_from_id(self, user_id):
+        return Group(self, ("USER", user_id))
+
+    def _all(self, category, *ids):
+        defaults = self.defaults[category]
+        size = len(ids) + 1
+        return {scope[size]: _merge(defaults, data) for scope, data in self.data.items()
+                if scope[:size] == (category,) + ids}
+
+    async def all_guilds(self):
+        await meter("Config.all_guilds")
+        return self._all("GUILD")
+
+    async def all_users(self):
+        await meter("Config.all_users")
+        return self._all("USER")
+
+    async def all_members(self, guild=None):
+        await meter("Config.all_members")
+        if guild is not None:
+            return self._all("MEMBER", guild.id)
+        members = {}
+        for (category, *ids), data in self.data.items():
+            if category == "MEMBER":
+                members.setdefault(ids[0], {})[ids[1]] = _merge(self.defaults["MEMBER"], data)
+        return members
+
+    async def _clear(self, category, *ids):
+        await meter("Config.clear_all")
+        size = len(ids) + 1
+        for scope in [x for x in self.data if x[:size] == (category,) + ids]:
+            del self.data[scope]
+
+    async def clear_all(self):
+        await meter("Config.clear_all")
+        self.data.clear()
+
+    async def clear_all_globals(self):
+        await self._clear("GLOBAL")
+
+    async def clear_all_guilds(self):
+        await self._clear("GUILD")
+
+    async def clear_all_users(self):
+        await self._clear("USER")
+
+    async def clear_all_members(self, guild=None):
+        await self._clear("MEMBER", *([] if guild is None else [guild.id]))
+
+
+class Bank:
+    """The bank functions the cogs call, over a dictionary of balances.
+
+    Accounts are keyed by user id and open with the starting balance on first use.
+    """
+
+    def __init__(self, balance=10 ** 9, currency="credits"):
+        self.balance = balance
+        self.currency = currency
+        self.balances = {}
+
+    def _account(self, member):
+        return self.balances.setdefault(member.id, self.balance)
+
+    async def get_balance(self, member):
+        await meter("bank.get_balance")
+        return self._account(member)
+
+    async def set_balance(self, member, amount):
+        await meter("bank.set_balance")
+        self.balances[member.id] = amount
+        return amount
+
+    async def can_spend(self, member, amount):
+        await meter("bank.can_spend")
+        return self._account(member) >= amount
+
+    async def withdraw_credits(self, member, amount):
+        await meter("bank.withdraw_credits")
+        balance = self._account(member)
+        if amount > balance:
+            raise ValueError("Insufficient funds {} > {}".format(amount, balance))
+        self.balances[member.id] = balance - amount
+        return balance - amount
+
+    async def deposit_credits(self, member, amount):
+        await meter("bank.deposit_credits")
+        balance = self.balances[member.id] = self._account(member) + amount
+        return balance
+
+    async def transfer_credits(self, from_, to, amount):
+        await self.withdraw_credits(from_, amount)
+        return await self.deposit_credits(to, amount)
+
+    async def get_currency_name(self, guild=None):
+        await meter("bank.get_currency_name")
+        return self.currency
+
+    async def is_global(self):
+        await meter("bank.is_global")
+        return False
+
+
+def install(bank=None):
+    """Replaces Config and the bank functions of redbot.core. Returns the Bank used."""
+    import redbot.core
+    from redbot.core import bank as red_bank
+
+    bank = bank or Bank()
+    redbot.core.Config = Config
+    for name in BANK_FUNCTIONS:
+        setattr(red_bank, name, getattr(bank, name))
+    return bank
+
+
+def shadow(module, name, **attributes):
+    """Gives module its own copy of the module it imported as name, with attributes
+    replaced, so a cog can be changed without touching any other module."""
+    copy = types.ModuleType(name)
+    copy.__dict__.update(vars(getattr(module, name)))
+    copy.__dict__.update(attributes)
+    setattr(module, name, copy)
+
+
+def scale_pauses(module, scale=0.0):
+    """Shortens every asyncio.sleep of module by scale. At 0 a pause only yields."""
+    async def sleep(delay, result=None):
+        return await asyncio.sleep(delay * scale, result)
+
+    shadow(module, "asyncio", sleep=sleep)
+
+
+class Snowflake:
+    __slots__ = ('id', 'name')
+
+    def __init__(self, id, name=None):
+        self.id = id
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class Guild(Snowflake):
+    __slots__ = ('roles', 'members', 'owner')
+
+    def __init__(self, id, name="Guild", roles=()):
+        super().__init__(id, name)
+        self.roles = list(roles)
+        self.members = {}
+        self.owner = None
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+
+class User(Snowflake):
+    __slots__ = ('bot', 'created_at', 'display_name')
+
+    def __init__(self, id, name=None, bot=False):
+        super().__init__(id, name or "Player{}".format(id))
+        self.bot = bot
+        self.display_name = self.name
+        self.created_at = datetime.datetime(2020, 1, 1)
+
+    @property
+    def mention(self):
+        return "<@{}>".format(self.id)
+
+    @property
+    def avatar_url(self):
+        return ""
+
+    def is_on_mobile(self):
+        return False
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class Member(User):
+    __slots__ = ('guild', 'roles', 'joined_at', 'guild_permissions')
+
+    def __init__(self, id, guild, roles=(), joined_at=None):
+        super().__init__(id)
+        self.guild = guild
+        self.roles = list(roles)
+        self.joined_at = joined_at or self.created_at
+        self.guild_permissions = types.SimpleNamespace(administrator=False)
+        guild.members[id] = self
+
+
+class Reaction:
+    __slots__ = ('emoji', '_users')
+
+    def __init__(self, emoji, users):
+        self.emoji = emoji
+        self._users = users
+
+    def users(self):
+        return self
+
+    async def flatten(self):
+        return list(self._users)
+
+
+class Message(Snowflake):
+    __slots__ = ('content', 'author', 'channel', 'guild', 'created_at', 'embeds', 'reactions')
+
+    def __init__(self, content, author, channel, guild=None, embed=None):
+        super().__init__(next(_ids))
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+        self.created_at = datetime.datetime.utcnow()
+        self.embeds = [] if embed is None else [embed]
+        self.reactions = []
+
+    async def edit(self, content=None, embed=None):
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+
+    async def delete(self):
+        pass
+
+    async def add_reaction(self, emoji):
+        pass
+
+
+class Channel(Snowflake):
+    """A text channel that keeps the messages posted to it by post."""
+
+    __slots__ = ('guild', 'messages')
+
+    def __init__(self, id, guild=None):
+        super().__init__(id, "channel{}".format(id))
+        self.guild = guild
+        self.messages = {}
+
+    def post(self, author, content=None, embed=None):
+        message = Message(content, author, self, self.guild, embed)
+        self.messages[message.id] = message
+        return message
+
+    async def fetch_message(self, message_id):
+        return self.messages[message_id]
+
+    async def send(self, content=None, embed=None):
+        return Message(content, None, self, self.guild, embed)
+
+
+class Bot:
+    """Delivers replies to wait_for the way discord.py does, by testing every waiting check
+    against every message."""
+
+    def __init__(self):
+        self.user = User(1, "Casino", bot=True)
+        self.loop = asyncio.get_event_loop()
+        self.channels = {}
+        self.guilds = {}
+        self.commands = {}
+        self._waiting = []
+
+    async def wait_until_ready(self):
+        pass
+
+    async def is_owner(self, user):
+        return False
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_guild(self, guild_id):
+        return self.guilds.get(guild_id)
+
+    async def get_embed_color(self, location):
+        return 0xFF0000
+
+    async def wait_for(self, event, check=None, timeout=None):
+        entry = (check, self.loop.create_future())
+        self._waiting.append(entry)
+        try:
+            return await asyncio.wait_for(entry[1], timeout)
+        finally:
+            self._waiting.remove(entry)
+
+    def receive(self, message):
+        """Hands message to every wait_for it passes. Returns True if there was one."""
+        answered = False
+        for check, future in self._waiting:
+            if not future.done() and (check is None or check(message)):
+                future.set_result(message)
+                answered = True
+        return answered
+
+
+class Context:
+    """A command invocation by author in channel.
+
+    replies answers the prompts of the command, in order: after every message the
+    command sends, the next reply is handed to the casino's prompt dispatcher and to every
+    bot.wait_for. It is used up once a prompt or a wait_for accepts it, and otherwise
+    offered again after the next message. Replies left over when the command ends are
+    ignored: only the latest command of an author in a channel is answered.
+    """
+
+    __slots__ = ('bot', 'author', 'guild', 'channel', 'message', 'replies', 'sent')
+
+    def __init__(self, bot, author, channel, replies=()):
+        self.bot = bot
+        self.author = author
+        self.guild = author.guild
+        self.channel = channel
+        self.message = Message("", author, channel, author.guild)
+        self.replies = deque(replies)
+        self.sent = 0
+        bot.commands[(channel.id, author.id)] = self
+
+    @property
+    def prefix(self):
+        return "!"
+
+    async def embed_colour(self):
+        return 0xFF0000
+
+    def _answer(self):
+        from casino.prompts import prompts
+
+        if not self.replies or self.bot.commands[(self.channel.id, self.author.id)] is not self:
+            return
+        message = Message(self.replies[0], self.author, self.channel, self.guild)
+        answered = self.bot.receive(message) | prompts.dispatch(message)
+        if answered:
+            self.replies.popleft()
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+        self.bot.loop.call_soon(self._answer)
+        return Message(content, self.bot.user, self.channel, self.guild, kwargs.get("embed"))
@@ -0,0 +1,268 @@
+"""Load generator for the cogs of this repository.
+
+Thousands of players spread over a number of guilds issue commands at the same time,
+against the in memory Config and bank of fakes.py, which can be given latency. The casino
+writes its session and audit logs to a temporary folder. Each player runs its commands
+one after another, picking each one at random by weight. Prompts are answered at once by
+the player, and the cogs' pauses are scaled by --pause-scale, so at the default of 0 the
+latencies are the cost of the code and of waiting on other players. Run from the root of
+the repository:
+
+    python benchmarks/loadgen.py [--players 2000] [--config-latency 2] [-k casino]
+
+Prints the p50, p99 and worst latency of every command, and the Config and bank calls
+made per command.
+"""
+
+# Standard Library
+import argparse
+import asyncio
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes  # noqa: E402
+
+fakes.install()
+
+# Casino
+from casino import games  # noqa: E402
+from casino.audit import audit  # noqa: E402
+from casino.casino import Casino  # noqa: E402
+from casino.data import Database  # noqa: E402
+from casino.rng import rng  # noqa: E402
+from casino.sessions import sessions  # noqa: E402
+
+# Cogs
+from race import race  # noqa: E402
+from raffle import raffle  # noqa: E402
+from russianroulette import russianroulette  # noqa: E402
+from shop import shop  # noqa: E402
+
+# Discord
+import discord  # noqa: E402
+
+# Third-Party Libraries
+from tabulate import tabulate  # noqa: E402
+
+TICKET = "\U0001F39F"
+
+# name, relative weight, the replies of the player, and a coroutine function taking the
+# Server and the Context of the command.
+Command = namedtuple("Command", "name weight replies run")
+
+
+class Server:
+    """A guild, its players and the cogs they use.
+
+    Race keeps the race in progress on the cog, so every guild gets its own Race, as if
+    it were the only guild of its bot.
+    """
+
+    def __init__(self, bot, number, size):
+        self.bot = bot
+        self.guild = fakes.Guild(number, roles=[fakes.Snowflake(number, "Member")])
+        self.guild.owner = fakes.Member(number << 20, self.guild)
+        self.channel = fakes.Channel(number, self.guild)
+        self.players = [fakes.Member((number << 20) + x + 1, self.guild, self.guild.roles)
+                        for x in range(size)]
+        self.guild.members[bot.user.id] = bot.user
+        self.race = race.Race()
+        bot.guilds[number] = self.guild
+        bot.channels[number] = self.channel
+
+    def ctx(self, player, replies=()):
+        return fakes.Context(self.bot, player, self.channel, replies)
+
+
+class Cogs:
+    """One instance of every cog, shared by all guilds except for Race."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.casino = Casino.__new__(Casino)
+        self.casino.bot = bot
+        self.shop = shop.Shop()
+        self.raffle = raffle.Raffle(bot)
+        self.russian = russianroulette.RussianRoulette()
+        self.games = {"Core": games.Core(), "Blackjack": games.Blackjack(),
+                      "War": games.War(), "Double": games.Double(),
+                      "Pikapokeri": games.Pikapokeri()}
+
+    async def open(self, server):
+        """Lets every casino bet through back to back and stocks the guild's shop."""
+        group = await Database().get_data(server.ctx(server.players[0]))
+        async with group.Games() as settings:
+            for game in settings.values():
+                game["Cooldown"] = 0
+        await self.shop.db.guild(server.guild).Shops.set({
+            "Store": {"Role": "Member", "Items": {"Potion": {
+                "Cost": 10, "Qty": None, "Type": "basic", "Info": "Heals", "Role": None,
+                "Messages": []}}}})
+
+    async def raffle_end(self, server, ctx):
+        """Draws a raffle every player of the guild entered, as raffle end does."""
+        embed = discord.Embed(title="Load", description="")
+        embed.add_field(name="Days on Server", value="0")
+        embed.add_field(name="Allowed Roles", value="Member")
+        embed.set_footer(text="Started by: {} | Winners: 1 | Raffle ID: 0".format(ctx.author))
+        message = server.channel.post(self.bot.user, embed=embed)
+        message.reactions.append(fakes.Reaction(TICKET, [self.bot.user] + server.players))
+        async with self.raffle.db.guild(server.guild).Raffles() as raffles:
+            raffles[message.id] = {"Channel": server.channel.id, "Timestamp": 0, "DOS": 0,
+                                   "Roles": ["Member"], "ID": message.id, "Title": "Load"}
+        await raffle.Raffle.end.callback(self.raffle, ctx, message.id)
+        del server.channel.messages[message.id]
+
+    def commands(self):
+        core, bj, war = self.games["Core"], self.games["Blackjack"], self.games["War"]
+        double, pp = self.games["Double"], self.games["Pikapokeri"]
+        return [
+            Command("casino allin", 1, (), lambda s, ctx: core.play_allin(ctx, 10, 2)),
+            Command("casino coin", 3, (), lambda s, ctx: core.play_coin(ctx, 10, "heads")),
+            Command("casino cups", 2, (), lambda s, ctx: core.play_cups(ctx, 25, "1")),
+            Command("casino dice", 2, (), lambda s, ctx: core.play_dice(ctx, 25)),
+            Command("casino hilo", 2, (), lambda s, ctx: core.play_hilo(ctx, 25, "low")),
+            Command("casino craps", 2, (), lambda s, ctx: core.play_craps(ctx, 50)),
+            Command("casino blackjack", 4, ("hit", "stay"), lambda s, ctx: bj.play(ctx, 50)),
+            Command("casino war", 2, ("war",), lambda s, ctx: war.play(ctx, 25)),
+            Command("casino double", 2, ("double", "cash out"),
+                    lambda s, ctx: double.play(ctx, 10)),
+            Command("casino pikapokeri", 6, ("1", "1", "2", "2"),
+                    lambda s, ctx: pp.play(ctx, 10)),
+            Command("shop buy", 3, ("1",),
+                    lambda s, ctx: shop.Shop.buy.callback(self.shop, ctx, "Store", "Potion")),
+            Command("race start", 1, (),
+                    lambda s, ctx: race.Race.start.callback(s.race, ctx)),
+            Command("race enter", 3, (),
+                    lambda s, ctx: race.Race.enter.callback(s.race, ctx)),
+            Command("race stats", 1, (),
+                    lambda s, ctx: race.Race.stats.callback(s.race, ctx)),
+            Command("russian", 3, (), lambda s, ctx: russianroulette.RussianRoulette.russian
+                    .callback(self.russian, ctx)),
+            Command("raffle end", 0.1, (), self.raffle_end),
+        ]
+
+
+class Recorder:
+    __slots__ = ('latencies', 'errors')
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    async def run(self, command, server, player):
+        ctx = server.ctx(player, command.replies)
+        start = time.perf_counter()
+        try:
+            await command.run(server, ctx)
+        except Exception as e:
+            self.errors.setdefault(command.name, repr(e))
+        self.latencies.setdefault(command.name, []).append(time.perf_counter() - start)
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def play(recorder, server, player, commands, weights, rounds, think, chance):
+    for x in range(rounds):
+        if think:
+            await asyncio.sleep(chance.expovariate(1 / think))
+        command = chance.choices(commands, weights)[0]
+        await recorder.run(command, server, player)
+
+
+async def run(args):
+    rng.configure(seed=args.seed)
+    chance = random.Random(args.seed)
+    random.seed(args.seed)
+    for module in (games, race, russianroulette, shop):
+        fakes.scale_pauses(module, args.pause_scale)
+    # Russian roulette only lets discord.Member objects play.
+    fakes.shadow(russianroulette, "discord", Member=fakes.Member)
+
+    bot = fakes.Bot()
+    cogs = Cogs(bot)
+    size = max(1, args.players // args.guilds)
+    servers = [Server(bot, x + 1, size) for x in range(args.guilds)]
+    for server in servers:
+        await cogs.open(server)
+    commands = [x for x in cogs.commands()
+                if args.keyword is None or args.keyword.lower() in x.name]
+    weights = [x.weight for x in commands]
+
+    fakes.meter.reset()
+    fakes.meter.latency.update(Config=args.config_latency / 1000,
+                               bank=args.bank_latency / 1000)
+    flusher = bot.loop.create_task(cogs.casino.cache_flusher())
+    recorder = Recorder()
+    start = time.perf_counter()
+    await asyncio.gather(*(play(recorder, server, player, commands, weights, args.rounds,
+                                args.think / 1000, chance)
+                           for server in servers for player in server.players))
+    elapsed = time.perf_counter() - start
+    flusher.cancel()
+    await cogs.casino.cache.flush()
+    await cogs.casino.compact_counters()
+    return recorder, elapsed
+
+
+def report(recorder, elapsed):
+    rows = []
+    total = 0
+    for name, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        total += len(ordered)
+        rows.append((name, len(ordered)) + tuple("{:.2f}".format(x * 1000) for x in (
+            percentile(ordered, 0.5), percentile(ordered, 0.99), ordered[-1])))
+    print(tabulate(rows, headers=("Command", "count", "p50 ms", "p99 ms", "max ms"),
+                   colalign=("left", "right", "right", "right", "right")))
+    print("\n{} commands in {:.2f}s, {:,.0f} commands/sec\n".format(total, elapsed,
+                                                                   total / elapsed))
+    calls = sorted(fakes.meter.calls.items())
+    print(tabulate([(name, count, "{:.2f}".format(count / total)) for name, count in calls],
+                   headers=("Backend call", "calls", "per command"),
+                   colalign=("left", "right", "right")))
+    for name, error in sorted(recorder.errors.items()):
+        print("{} raised {}".format(name, error))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--players", type=int, default=2000)
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5, help="Commands issued per player.")
+    parser.add_argument("--config-latency", type=float, default=0.0, metavar="MS",
+                        help="Milliseconds every Config read and write takes.")
+    parser.add_argument("--bank-latency", type=float, default=0.0, metavar="MS",
+                        help="Milliseconds every bank call takes.")
+    parser.add_argument("--think", type=float, default=0.0, metavar="MS",
+                        help="Mean milliseconds a player waits between commands.")
+    parser.add_argument("--pause-scale", type=float, default=0.0,
+                        help="Scales the pauses of the games, 1 to keep them as they are.")
+    parser.add_argument("--seed", type=int, default=1492)
+    parser.add_argument("-k", "--keyword", help="Only issue commands whose name contains it.")
+    args = parser.parse_args()
+
+    # Every game writes to the session and audit logs, as it does in the bot.
+    with tempfile.TemporaryDirectory() as folder:
+        sessions.attach(os.path.join(folder, "sessions"))
+        audit.attach(pathlib.Path(folder, "audit"))
+        try:
+            result = asyncio.run(run(args))
+        finally:
+            sessions.detach()
+            audit.detach()
+    report(*result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# Standard Library
+import mmap
+import struct
+import time
+from collections import namedtuple
+
+# Casino
+from .rng import rng
+from .sessions import pack, unpack
+
+# Bytes in one file of the audit log, and how many files are kept before the oldest is
+# deleted. Eight files of 4 MiB hold roughly a quarter of a million rounds.
+AUDIT_SEGMENT = 4 << 20
+AUDIT_SEGMENTS = 8
+
+# length, round id, scope (0 in global mode), player id, time, bet, won, amount, payout
+_RECORD = struct.Struct("<IQQQdqqqq")
+_LENGTH = struct.Struct("<I")
+_NUMBER = struct.Struct("<q")
+
+Record = namedtuple("Record", "round scope player time bet won amount payout game args "
+                              "choices numbers shuffles")
+_Snowflake = namedtuple("_Snowflake", "id")
+
+
+def _encode(arg):
+    if isinstance(arg, int):
+        return b"i" + str(arg).encode()
+    if isinstance(arg, str):
+        return b"s" + arg.encode()
+    # Lists of cards, as given to bjmock.
+    return b"b" + bytes(arg)
+
+
+def _decode(data):
+    kind, value = data[:1], data[1:]
+    if kind == b"i":
+        return int(value)
+    if kind == b"s":
+        return value.decode()
+    return list(value)
+
+
+def _parse(data, offset):
+    fields = _RECORD.unpack_from(data, offset)
+    length, round_id, scope, player, when, bet, won, amount, payout = fields
+    game, args, choices, numbers, *shuffles = unpack(
+        data[offset + _RECORD.size:offset + length])
+    return Record(round_id, scope or None, player, when, bet, won, amount, payout,
+                  game.decode(), [_decode(x) for x in unpack(args)],
+                  [x.decode() for x in unpack(choices)],
+                  [x for x, in _NUMBER.iter_unpack(numbers)], shuffles)
+
+
+class AuditLog:
+    """Every round played, as compact binary records in a rotating memory-mapped log.
+
+    A record holds the game method and its arguments, the bet, every number drawn and
+    deck shuffled during the round, the player's choices and the outcome. That is enough
+    to play the round again through the same game code, whichever generator drew the
+    numbers, see replay.
+
+    The log is a directory of numbered files of AUDIT_SEGMENT bytes each. Records are
+    copied into the mapped file of the newest one, and a record's length is written last,
+    so a reader never sees half a record. A zero length marks the end of the file. When a
+    record does not fit, the next file is started and the oldest is deleted.
+    """
+
+    __slots__ = ('path', 'number', 'offset', '_file', '_map')
+
+    def __init__(self):
+        self.path = None
+        self.number = 0
+        self.offset = 0
+        self._file = None
+        self._map = None
+
+    def _segment(self, number):
+        return self.path / "{:08d}.log".format(number)
+
+    def _segments(self):
+        return sorted(int(x.stem) for x in self.path.glob("*.log") if x.stem.isdigit())
+
+    def attach(self, path):
+        """Opens the newest file of the log in path, creating the log if needed."""
+        self.path = path
+        path.mkdir(parents=True, exist_ok=True)
+        segments = self._segments()
+        self._open(segments[-1] if segments else 0)
+
+    def _open(self, number):
+        self.number = number
+        self._file = open(str(self._segment(number)), "a+b")
+        self._file.truncate(AUDIT_SEGMENT)
+        self._map = mmap.mmap(self._file.fileno(), AUDIT_SEGMENT)
+        offset = 0
+        while offset + _LENGTH.size <= AUDIT_SEGMENT:
+            length, = _LENGTH.unpack_from(self._map, offset)
+            if not length:
+                break
+            offset += length
+        self.offset = offset
+
+    def _close(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    def _rotate(self):
+        self._close()
+        stale = self._segment(self.number + 1 - AUDIT_SEGMENTS)
+        if stale.exists():
+            stale.unlink()
+        self._open(self.number + 1)
+
+    def record(self, engine, method, args, round_):
+        """
+
+        :param engine: GameEngine
+            The engine of the round once the game is over.
+        :param method: str
+            The qualified name of the game coroutine, such as Core.play_coin.
+        :param args: Tuple
+            The arguments the coroutine was called with after ctx.
+        :param round_: Round
+        :return: None
+        """
+        if self._map is None:
+            return
+        ctx = engine.ctx
+        payload = pack(method.encode(), pack(*(_encode(x) for x in args)),
+                       pack(*(x.encode() for x in round_.choices)),
+                       b"".join(_NUMBER.pack(x) for x in round_.numbers), *round_.shuffles)
+        length = _RECORD.size + len(payload)
+        if length + _LENGTH.size > AUDIT_SEGMENT:
+            return
+        if self.offset + length + _LENGTH.size > AUDIT_SEGMENT:
+            self._rotate()
+        data = _RECORD.pack(length, ctx.message.id, engine.transaction.key[0] or 0,
+                            ctx.author.id, time.time(), engine.bet, int(engine.won),
+                            int(engine.amount), int(engine.payout)) + payload
+        start = self.offset
+        self._map[start + _LENGTH.size:start + length] = data[_LENGTH.size:]
+        self._map[start:start + _LENGTH.size] = data[:_LENGTH.size]
+        self.offset += length
+
+    def find(self, round_id):
+        """Returns the Record of a round, or None once it has rotated out of the log.
+
+        Reads the files from disk rather than the mapping, so it can run in an executor.
+        """
+        if self.path is None:
+            return None
+        for number in reversed(self._segments()):
+            try:
+                with open(str(self._segment(number)), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            offset = 0
+            while offset + _RECORD.size <= len(data):
+                length, = _LENGTH.unpack_from(data, offset)
+                if not length:
+                    break
+                if _RECORD.unpack_from(data, offset)[1] == round_id:
+                    return _parse(data, offset)
+                offset += length
+        return None
+
+    def detach(self):
+        self._close()
+        self.path = None
+
+
+class ReplayContext:
+    """Stands in for the context of a recorded round while it is played again.
+
+    Messages the game sends are kept in sent instead of being sent. The guild is a
+    placeholder, so the replay never shares a deck or a blackjack table with a game the
+    player is playing.
+    """
+
+    __slots__ = ('bot', 'author', 'guild', 'channel', 'message', 'sent')
+
+    def __init__(self, ctx, author, round_id):
+        self.bot = ctx.bot
+        self.author = author
+        self.guild = _Snowflake(0)
+        self.channel = ctx.channel
+        self.message = _Snowflake(round_id)
+        self.sent = []
+
+    async def send(self, *args, **kwargs):
+        self.sent.append((args, kwargs))
+
+
+async def replay(record, ctx, author, games):
+    """
+
+    :param record: Record
+    :param ctx: Context object
+        The context of the replay command.
+    :param author: Member or user object
+        The player of the round.
+    :param games: Dictionary
+        The game classes by name.
+    :return: Tuple
+        The game's result and the Round of the replay.
+
+    Plays a recorded round again through the game's own code, without the game engine, so
+    no bet is taken and nothing is paid. The recorded numbers and shuffles are handed out
+    again in their order and every prompt is answered with the recorded choice.
+    """
+    cls, method = record.game.split(".")
+    game = getattr(games[cls], method).__wrapped__
+    replay_ctx = ReplayContext(ctx, author, record.round)
+    with rng.round(record.numbers, record.shuffles, record.choices) as round_:
+        result = await game(games[cls](), replay_ctx, *record.args)
+    return result, round_
+
+
+audit = AuditLog()
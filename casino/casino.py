@@ -3,19 +3,29 @@
 # Standard Library
 import asyncio
 import calendar
+import datetime
 import re
+from functools import partial
 from typing import Union
 from operator import itemgetter
 
 
 # Casino
-from . import utils
-from .data import Database
+from . import odds, simulator, utils
+from .audit import audit, replay
+from .data import Database, FLUSH_INTERVAL
+from .deck import Deck
+from .simulator import PIKAPOKERI
+from .stats import METRICS
 from .games import Core, Blackjack, Double, War, Pikapokeri
+from .prompts import prompts
+from .rng import rng
+from .sessions import sessions
 
 # Red
 from redbot.core.i18n import Translator
 from redbot.core import bank, commands, checks
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.chat_formatting import box
 from redbot.core.utils.predicates import MessagePredicate
 
@@ -30,13 +40,28 @@ __author__ = "Redjumpman"
 
 _ = Translator("Casino", __file__)
 
+# Most Pikapokeri hands a player can play with one batch command.
+BATCH_LIMIT = 100
+# Players whose balances are fetched at once by the membership updater.
+UPDATE_BATCH = 100
+# Seconds the membership updater keeps collecting queued players before processing them.
+UPDATE_DEBOUNCE = 5
+# Seconds between full passes over every player.
+SWEEP_INTERVAL = 3600
+
 
 class Casino(Database, commands.Cog):
-    __slots__ = ('bot', 'cycle_task')
+    __slots__ = ('bot', 'cycle_task', 'flush_task', 'fingerprints')
 
     def __init__(self, bot):
         self.bot = bot
+        self.fingerprints = {}
+        sessions.attach(cog_data_path(self) / "sessions")
+        audit.attach(cog_data_path(self) / "audit")
+        self.bot.loop.create_task(self.refund_sessions(sessions.recover()))
+        self.bot.loop.create_task(self.configure_rng())
         self.cycle_task = self.bot.loop.create_task(self.membership_updater())
+        self.flush_task = self.bot.loop.create_task(self.cache_flusher())
         super().__init__()
 
     # --------------------------------------------------------------------------------------------------
@@ -54,7 +79,7 @@ class Casino(Database, commands.Cog):
         bet = await bank.get_balance(ctx.author)
         await Core().play_allin(ctx, bet, multiplier)
 
-    @commands.command(name="blackjack", aliases=['bj', '21'])
+    @commands.group(name="blackjack", aliases=['bj', '21'], invoke_without_command=True)
     @commands.guild_only()
     async def _blackjack(self, ctx, bet: int):
         """Play a game of blackjack.
@@ -63,12 +88,74 @@ class Casino(Database, commands.Cog):
         """
         await Blackjack().play(ctx, bet)
 
-    @commands.command(name="pikapokeri", aliases=['pp', 'pikap'])
+    @_blackjack.command(name="hint")
+    @commands.guild_only()
+    async def _blackjack_hint(self, ctx):
+        """Shows what each option of your blackjack hand is expected to return.
+
+        The odds are exact for the cards you can see, assuming every later choice is the
+        best one.
+        """
+        try:
+            ph, dh = Blackjack.tables[(ctx.guild.id, ctx.author.id)]
+        except KeyError:
+            return await ctx.send(_("You are not playing blackjack right now."))
+        settings = await super().get_settings(ctx)
+        multiplier = settings["Games"]["Blackjack"]["Multiplier"]
+        task = partial(odds.blackjack_hint, list(ph), dh[0], multiplier, first=len(ph) == 2)
+        hint = await ctx.bot.loop.run_in_executor(None, task)
+
+        options = {_("stay"): hint.stay, _("hit"): hint.hit}
+        if hint.double is not None:
+            options[_("double")] = hint.double
+        best = max(options, key=options.get)
+        rows = [(name, "{:+.2%}".format(value)) for name, value in options.items()]
+        headers = (_("Option"), _("Expected Return"))
+        msg = _("{}\n\nBest play: {}").format(tabulate(rows, headers=headers), best)
+        await ctx.send(box(msg, lang='cpp'))
+
+    @_blackjack.command(name="odds")
+    @commands.guild_only()
+    async def _blackjack_odds(self, ctx):
+        """Shows the exact house edge of blackjack at this casino.
+
+        Every start is counted with the best play at every choice, at this casino's
+        multiplier. Membership bonuses are not included.
+        """
+        settings = await super().get_settings(ctx)
+        multiplier = settings["Games"]["Blackjack"]["Multiplier"]
+        result = await ctx.bot.loop.run_in_executor(None, odds.blackjack, multiplier)
+        msg = _("Multiplier: {}\nExpected return per credit: {:+.4%}\n"
+                "House edge: {:.4%}").format(multiplier, result, -result)
+        await ctx.send(box(msg, lang='cpp'))
+
+    @commands.group(name="pikapokeri", aliases=['pp', 'pikap'], invoke_without_command=True)
     @commands.guild_only()
     async def _pikapokeri(self, ctx, bet: int):
         
         await Pikapokeri().play(ctx, bet)
 
+    @_pikapokeri.command(name="batch")
+    @commands.guild_only()
+    async def _pikapokeri_batch(self, ctx, hands: int, bet: int, policy: str = "best"):
+        """Plays many hands of Pikapokeri at once.
+
+        Every hand is a separate bet, so the bet must be within the game's limits. The
+        option card is picked by the policy: `best`, `pair` or `first`, followed by
+        `:<times to double up>` to double every paying hand, for example `best:1`.
+        """
+        option, sep, doubles = policy.lower().partition(":")
+        if not 1 <= hands <= BATCH_LIMIT:
+            return await ctx.send(_("You can play 1 to {} hands at once.").format(BATCH_LIMIT))
+        if option not in PIKAPOKERI or not (doubles or "0").isdigit() or int(doubles or 0) > 5:
+            return await ctx.send(_("The policy must be best, pair or first, optionally "
+                                    "followed by :0 to :5 double ups."))
+        if option == "best":
+            # The best policy compares exact odds, whose tables take seconds to build
+            # the first time. Build them off the event loop.
+            await ctx.bot.loop.run_in_executor(None, odds.pikapokeri)
+        await Pikapokeri().play_batch(ctx, bet, hands, option, int(doubles or 0))
+
     @commands.command()
     @commands.guild_only()
     async def craps(self, ctx: commands.Context, bet: int):
@@ -151,8 +238,11 @@ class Casino(Database, commands.Cog):
         Example: [p]bjmock 50 :clubs: 10, :diamonds: 10 | :clubs: Ace, :clubs: Queen
         """
         ph, dh = hands.split(' | ')
-        ph = [(x[0], int(x[2:])) if x[2:].isdigit() else (x[0], x[2:]) for x in ph.split(', ')]
-        dh = [(x[0], int(x[2:])) if x[2:].isdigit() else (x[0], x[2:]) for x in dh.split(', ')]
+        try:
+            ph = [Deck.parse_card(x) for x in ph.split(', ')]
+            dh = [Deck.parse_card(x) for x in dh.split(', ')]
+        except ValueError:
+            return await ctx.send("Invalid hand input.")
         await Blackjack().mock(ctx, bet, ph, dh)
 
     # --------------------------------------------------------------------------------------------------
@@ -239,7 +329,9 @@ class Casino(Database, commands.Cog):
 
         if choice.content.lower() == 'yes':
             await player_data.Pending_Credits.clear()
+            await super().invalidate(ctx, player=player)
             await bank.deposit_credits(player, amount)
+            self.updates.schedule(await super().get_scope(ctx), player)
             await ctx.send(_("{0.mention} Your pending amount of {1} has been approved by "
                              "{2.name}, and was deposited into your "
                              "account.").format(player, amount, ctx.author))
@@ -338,6 +430,7 @@ class Casino(Database, commands.Cog):
         player_instance = await super().get_data(ctx, player=player)
         await player_instance.Membership.set({'Name': membership,
                                               'Assigned': True})
+        await super().invalidate(ctx, player=player)
 
         msg = _("{0.name} ({0.id}) manually assigned {1.name} ({1.id}) the "
                 "{2} membership.").format(ctx.author, player, membership)
@@ -357,6 +450,7 @@ class Casino(Database, commands.Cog):
             return await ctx.send(_("{} has no assigned membership.").format(player.name))
         else:
             await player_data.Membership.set({"Name": "Basic", "Assigned": False})
+            await super().invalidate(ctx, player=player)
         return await ctx.send(_("{} has unassigned {}'s membership. They have been set "
                                 "to `Basic` until the next membership update cycle."
                                 "").format(ctx.author.name, player.name))
@@ -421,19 +515,19 @@ class Casino(Database, commands.Cog):
         if player is None:
             player = ctx.author
 
-        casino = await super().get_data(ctx)
-        casino_name = await casino.Settings.Casino_Name()
-
-        coro = await super().get_data(ctx, player=player)
-        player_data = await coro.all()
+        settings = await super().get_settings(ctx)
+        casino_name = settings["Settings"]["Casino_Name"]
+        player_data = await super().get_player(ctx, player)
 
         mem, perks = await super()._get_player_membership(ctx, player)
         color = utils.color_lookup(perks['Color'])
 
-        games = sorted(await casino.Games.all())
-        played = [y for x, y in sorted(player_data["Played"].items(), key=itemgetter(0))]
-        won = [y for x, y in sorted(player_data["Won"].items(), key=itemgetter(0))]
+        games = sorted(settings["Games"])
+        totals = (await super().get_counters(ctx)).totals(player.id)
+        played, won = ([y for x, y in sorted(stat.items(), key=itemgetter(0))] for stat in totals)
         cool_items = [y for x, y in sorted(player_data["Cooldowns"].items(), key=itemgetter(0))]
+        if not self.cooldowns_current(settings, player_data):
+            cool_items = [0] * len(cool_items)
 
         reduction = perks['Reduction']
         fmt_reduct = utils.cooldown_formatter(reduction)
@@ -454,6 +548,144 @@ class Casino(Database, commands.Cog):
         embed.set_footer(text=disclaimer)
         await ctx.send(embed=embed)
 
+    @casino.command()
+    async def leaderboard(self, ctx: commands.Context, game: str = None, metric: str = "won"):
+        """Shows the top players of the casino.
+
+        Leave the game out to rank all games together. Players can be ranked by
+        `played`, `won` or `winrate`. Only players who have played are ranked.
+        """
+        if game is not None and game.lower() in METRICS:
+            game, metric = None, game
+        metric = metric.lower()
+        if metric not in METRICS:
+            return await ctx.send(_("Players can be ranked by: {}.").format(
+                utils.fmt_join(METRICS)))
+
+        settings = await super().get_settings(ctx)
+        if game is not None:
+            game = game.title()
+            if game not in settings["Games"]:
+                return await ctx.send(_("Invalid game name. Must be one of the following:\n"
+                                        "{}.").format(utils.fmt_join(sorted(settings["Games"]))))
+
+        counters = await super().get_counters(ctx)
+        rows = []
+        for idx, (player_id, played, won) in enumerate(counters.top(game, metric, 10), 1):
+            player = ctx.guild.get_member(player_id) if ctx.guild else None
+            player = player or self.bot.get_user(player_id)
+            name = player.display_name if player else str(player_id)
+            rate = "{:.1%}".format(won / played) if played else "-"
+            rows.append((idx, name, played, won, rate))
+
+        headers = ("#", _("Player"), _("Played"), _("Won"), _("Win Rate"))
+        rank = counters.rank(ctx.author.id, game, metric)
+        msg = _("{} Casino | {} by {}\n\n{}\n\nYour rank: {}").format(
+            settings["Settings"]["Casino_Name"], game or _("All Games"), metric,
+            tabulate(rows, headers=headers), rank or _("Unranked"))
+        await ctx.send(box(msg, lang='cpp'))
+
+    @casino.command(name="replay")
+    @checks.admin_or_permissions(administrator=True)
+    async def _replay(self, ctx: commands.Context, round_id: int):
+        """Plays a recorded round again to check its outcome.
+
+        The round id is the id of the message that started the game. The round is dealt
+        the recorded cards and numbers with the player's recorded choices, through the
+        game's own code. Nothing is bet or paid.
+        """
+        is_global = await super().casino_is_global()
+        if is_global and not await ctx.bot.is_owner(ctx.author):
+            return await ctx.send(_("While the casino is in global mode, only the bot owner "
+                                    "may use this command."))
+
+        record = await ctx.bot.loop.run_in_executor(None, audit.find, round_id)
+        if record is None or record.scope != (None if is_global else ctx.guild.id):
+            return await ctx.send(_("There is no round {} in the audit log.").format(round_id))
+
+        player = ctx.guild.get_member(record.player) if ctx.guild else None
+        player = player or self.bot.get_user(record.player)
+        if player is None:
+            return await ctx.send(_("The player of this round can no longer be found."))
+
+        games = {x.__name__: x for x in (Core, Blackjack, Double, War, Pikapokeri)}
+        try:
+            (won, amount, msg), round_ = await replay(record, ctx, player, games)
+        except Exception as e:
+            return await ctx.send(_("The round could not be replayed: {}").format(e))
+
+        match = (int(won), int(amount), round_.numbers, round_.shuffles) == (
+            record.won, record.amount, record.numbers, record.shuffles)
+        rows = [(_("Game"), record.game.split(".")[0]),
+                (_("Player"), player.display_name),
+                (_("Played"), datetime.datetime.utcfromtimestamp(record.time).strftime(
+                    "%Y-%m-%d %H:%M:%S UTC")),
+                (_("Bet"), record.bet),
+                (_("Numbers"), ", ".join(map(str, record.numbers)) or "-"),
+                (_("Choices"), ", ".join(x or _("(timeout)") for x in record.choices) or "-"),
+                (_("Won"), "{} / {}".format(record.won, int(won))),
+                (_("Amount"), "{} / {}".format(record.amount, int(amount))),
+                (_("Paid"), record.payout),
+                (_("Result"), _("Match") if match else _("MISMATCH"))]
+        table = box(_("Recorded / replayed\n\n{}").format(tabulate(rows)), lang='cpp')
+        if isinstance(msg, str):
+            await ctx.send(table)
+            await ctx.send(msg)
+        else:
+            await ctx.send(table, embed=msg)
+
+    @casino.command()
+    async def paytable(self, ctx: commands.Context):
+        """Shows the exact odds of every Pikapokeri hand.
+
+        Every start, option and completion is counted, with the option card always
+        chosen for the highest expected payout. The double-up is not included.
+        """
+        lines, rtp = await ctx.bot.loop.run_in_executor(None, odds.pikapokeri)
+        rows = [(x.label, x.multiplier, "{:.4%}".format(x.probability),
+                 "{:.4f}".format(x.contribution)) for x in lines]
+        headers = (_("Hand"), _("Pays"), _("Probability"), _("Return"))
+        msg = _("{}\n\nExpected return per credit: {:.4f}").format(
+            tabulate(rows, headers=headers), rtp)
+        await ctx.send(box(msg, lang='cpp'))
+
+    @casino.command()
+    @checks.is_owner()
+    async def simulate(self, ctx: commands.Context, game: str, rounds: int = 100000,
+                       strategy: str = None):
+        """Simulates a game to measure its return to player.
+
+        Plays the rounds headless over several processes and reports the return to player,
+        variance and hit frequency at this casino's multiplier for the game. Break-even is
+        the multiplier that would pay back exactly what was wagered.
+
+        Strategies: Allin `<multiplier>`, Blackjack `basic`, `dealer` or `stay`,
+        Double `<times to double>`, Hilo `low`, `high` or `seven`, Pikapokeri `best`,
+        `pair` or `first` followed by `:<times to double up>`, War `war` or `surrender`.
+        """
+        settings = await super().get_settings(ctx)
+        games = settings["Games"]
+        if game.title() not in games:
+            return await ctx.send(_("Invalid game name. Must be on of the following:\n"
+                                    "{}.").format(utils.fmt_join(list(games))))
+        if not 0 < rounds <= 10000000:
+            return await ctx.send(_("Rounds must be between 1 and 10000000."))
+
+        multiplier = games[game.title()]['Multiplier']
+        await ctx.send(_("Simulating {} rounds of {}...").format(rounds, game.title()))
+        task = partial(simulator.simulate, game, rounds, strategy, (multiplier,))
+        try:
+            report, = await ctx.bot.loop.run_in_executor(None, task)
+        except (KeyError, ValueError):
+            return await ctx.send(_("Invalid strategy for {}.").format(game.title()))
+
+        break_even = "-" if report.break_even is None else round(report.break_even, 3)
+        headers = (_("Strategy"), _("Multiplier"), _("RTP"), _("Std Dev"), _("Hit Rate"),
+                   _("Break-even"))
+        row = (report.strategy, report.multiplier or "-", "{:.2%}".format(report.rtp),
+               round(report.variance ** 0.5, 3), "{:.2%}".format(report.hit_rate), break_even)
+        await ctx.send(box(tabulate([row], headers=headers), lang='cpp'))
+
     @casino.command()
     @checks.admin_or_permissions(administrator=True)
     async def memdesigner(self, ctx: commands.Context):
@@ -527,6 +759,21 @@ class Casino(Database, commands.Cog):
         else:
             await ctx.send(_("Casino will remain {}.").format(mode))
 
+    @casinoset.command(name='rng')
+    @checks.is_owner()
+    async def _rng(self, ctx: commands.Context):
+        """Toggles the games between fast and secure random numbers.
+
+        Fast numbers come from a generator per game seeded by the operating system. Secure
+        numbers are all drawn from the operating system, so results can never be predicted
+        from earlier ones, at some cost in speed. This applies to every server.
+        """
+        secure = not await self.db.Secure_RNG()
+        await self.db.Secure_RNG.set(secure)
+        rng.configure(secure=secure)
+        await ctx.send(_("Casino games now use {} random numbers.").format(
+            _("secure") if secure else _("fast")))
+
     @casinoset.command()
     async def payoutlimit(self, ctx: commands.Context, limit: int):
         """Sets a payout limit.
@@ -541,6 +788,7 @@ class Casino(Database, commands.Cog):
 
         settings = await super().get_data(ctx)
         await settings.Settings.Payout_Limit.set(limit)
+        await super().invalidate(ctx)
         msg = _("{0.name} ({0.id}) set the payout limit to {1}.").format(ctx.author, limit)
         await ctx.send(msg)
 
@@ -554,6 +802,7 @@ class Casino(Database, commands.Cog):
         settings = await super().get_data(ctx)
         status = await settings.Settings.Payout_Switch()
         await settings.Settings.Payout_Switch.set(not status)
+        await super().invalidate(ctx)
         msg = _("{0.name} ({0.id}) turned the payout limit "
                 "{1}.").format(ctx.author, "OFF" if status else "ON")
         await ctx.send(msg)
@@ -569,6 +818,7 @@ class Casino(Database, commands.Cog):
 
         status = await settings.Settings.Casino_Open()
         await settings.Settings.Casino_Open.set(not status)
+        await super().invalidate(ctx)
         msg = _("{0.name} ({0.id}) {2} the {1} "
                 "Casino.").format(ctx.author, name, "closed" if status else "opened")
         await ctx.send(msg)
@@ -584,6 +834,7 @@ class Casino(Database, commands.Cog):
 
         settings = await super().get_data(ctx)
         await settings.Settings.Casino_Name.set(name)
+        await super().invalidate(ctx)
         msg = _("{0.name} ({0.id}) set the casino name to {1}.").format(ctx.author, name)
         await ctx.send(msg)
 
@@ -601,6 +852,7 @@ class Casino(Database, commands.Cog):
             return
 
         await settings.Games.set_raw(game.title(), 'Multiplier', value=multiplier)
+        await super().invalidate(ctx)
         msg = _("{0.name} ({0.id}) set "
                 "{1}'s multiplier to {2}.").format(ctx.author, game.title(), multiplier)
         if multiplier == 0:
@@ -632,6 +884,7 @@ class Casino(Database, commands.Cog):
                                     "{}.").format(utils.fmt_join(list(games))))
 
         await settings.Games.set_raw(game.title(), 'Cooldown', value=seconds)
+        await super().invalidate(ctx)
         cool = utils.cooldown_formatter(seconds)
         msg = _("{0.name} ({0.id}) set {1}'s "
                 "cooldown to {2}.").format(ctx.author, game.title(), cool)
@@ -653,6 +906,7 @@ class Casino(Database, commands.Cog):
             return await ctx.send(_("You can't set a minimum higher than the game's maximum bid."))
 
         await settings.Games.set_raw(game.title(), "Min", value=minimum)
+        await super().invalidate(ctx)
         msg = _("{0.name} ({0.id}) set {1}'s "
                 "minimum bid to {2}.").format(ctx.author, game.title(), minimum)
         await ctx.send(msg)
@@ -673,6 +927,7 @@ class Casino(Database, commands.Cog):
             return await ctx.send(_("You can't set a maximum lower than the game's minimum bid."))
 
         await settings.Games.set_raw(game.title(), "Max", value=maximum)
+        await super().invalidate(ctx)
         msg = _("{0.name} ({0.id}) set {1}'s "
                 "maximum bid to {2}.").format(ctx.author, game.title(), maximum)
         await ctx.send(msg)
@@ -690,6 +945,7 @@ class Casino(Database, commands.Cog):
             return
 
         await data.Games.set_raw(game.title(), 'Access', value=access)
+        await super().invalidate(ctx)
         msg = _("{0.name} ({0.id}) changed the access level "
                 "for {1} to {2}.").format(ctx.author, game, access)
         await ctx.send(msg)
@@ -704,120 +960,213 @@ class Casino(Database, commands.Cog):
 
         status = await instance.Games.get_raw(game.title(), 'Open')
         await instance.Games.set_raw(game.title(), 'Open', value=(not status))
+        await super().invalidate(ctx)
         msg = _("{0.name} ({0.id}) {2} the game "
                 "{1}.").format(ctx.author, game, "closed" if status else "opened")
         await ctx.send(msg)
 
     # --------------------------------------------------------------------------------------------------
 
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        prompts.dispatch(message)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles and not await super().casino_is_global():
+            self.updates.schedule(after.guild.id, after)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.index.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        if before.name != after.name:
+            self.index.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.index.invalidate(role.guild.id)
+
+    async def cache_flusher(self):
+        await self.bot.wait_until_ready()
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.cache.flush()
+                await self.compact_counters()
+            except Exception as e:
+                print(e)
+
+    async def configure_rng(self):
+        rng.configure(secure=await self.db.Secure_RNG())
+
+    async def refund_sessions(self, interrupted):
+        """Pays back the stake of every game that was still running when the bot stopped."""
+        if not interrupted:
+            return
+        await self.bot.wait_until_ready()
+        for session in interrupted:
+            if session.scope is None:
+                user = self.bot.get_user(session.player)
+            else:
+                guild = self.bot.get_guild(session.scope)
+                user = guild.get_member(session.player) if guild else None
+            if user is None or session.stake <= 0:
+                continue
+            try:
+                await bank.deposit_credits(user, session.stake)
+            except Exception as e:
+                print(e)
+            else:
+                print("Casino refunded {} credits to {} for an interrupted game."
+                      "".format(session.stake, user))
+
     async def membership_updater(self):
         await self.bot.wait_until_ready()
+        loop = asyncio.get_event_loop()
         try:
+            sweep = loop.time()
             while True:
-                await asyncio.sleep(10)  # Wait 5 minutes to cycle again
+                batch, sweeps = await self.updates.wait(UPDATE_DEBOUNCE, until=sweep)
                 is_global = await super().casino_is_global()
+                if loop.time() >= sweep:
+                    # Bank balances can change outside the casino, so everyone is still
+                    # checked now and then.
+                    sweep = loop.time() + SWEEP_INTERVAL
+                    sweeps = {None} if is_global else None
                 if is_global:
-                    await self.global_updater()
-                else:
-                    await self.local_updater()
+                    if None in (sweeps or ()):
+                        await self.global_updater()
+                elif sweeps is None or sweeps:
+                    await self.local_updater(sweeps)
+                await self.queue_updater(batch, is_global)
         except Exception as e:
             print(e)
 
-    async def global_updater(self):
-        while True:
-            users = await self.db.all_users()
-            if not users:
-                break
-            memberships = await self.db.Memberships.all()
-            if not memberships:
-                break
-            for user in users:
-                try:
-                    user_obj = await self.bot.fetch_user(user)
-                except AttributeError:
-                    try:
-                        user_obj = await self.bot.get_user_info(user)
-                    except discord.errors.NotFound:
-                        continue
-                except discord.errors.NotFound:
-                    continue
-                if await self.db.user(user_obj).Membership.Assigned():
-                    user_mem = await self.db.user(user_obj).Membership.Name()
-                    if user_mem not in memberships:
-                        basic = {"Name": "Basic", "Assigned": False}
-                        await self.db.user(user_obj).Membership.set(basic)
-                    else:
-                        continue
-                await self.process_user(memberships, user_obj, _global=True)
-            break
-
-    async def local_updater(self):
-        while True:
-            guilds = await self.db.all_guilds()
-            if not guilds:
-                break
-            for guild in guilds:
-                guild_obj = self.bot.get_guild(guild)
-                if not guild_obj:
-                    continue
-                users = await self.db.all_members(guild_obj)
-                if not users:
-                    continue
-                memberships = await self.db.guild(guild_obj).Memberships.all()
-                if not memberships:
-                    continue
-                for user in users:
-                    user_obj = guild_obj.get_member(user)
-                    if user_obj is None:
-                        continue
-                    if await self.db.member(user_obj).Membership.Assigned():
-                        user_mem = await self.db.member(user_obj).Membership.Name()
-                        if user_mem not in memberships:
-                            basic = {"Name": "Basic", "Assigned": False}
-                            await self.db.member(user_obj).Membership.set(basic)
-                        else:
-                            continue
-                    await self.process_user(memberships, user_obj)
-            break
-
-    async def process_user(self, memberships, user, _global=False):
-        qualified = []
-        try:
-            bal = await bank.get_balance(user)
-        except AttributeError:
-            raise RuntimeError("Casino is in global mode, while economy is in local mode. "
-                               "Economy must be global if Casino is global. Either change casino "
-                               "back to local or make your economy global.")
-        for name, requirements in memberships.items():
-            if _global:
-                if requirements['Credits'] and bal < requirements['Credits']:
-                    continue
-                elif (requirements['DOS'] and
-                      requirements['DOS'] > (user.created_at.now() - user.created_at).days):
-                    continue
-                else:
-                    qualified.append((name, requirements['Access']))
+    async def queue_updater(self, batch, is_global):
+        scopes = {}
+        for (scope, user_id), user in batch.items():
+            # Players queued before the casino changed mode are skipped.
+            if (scope is None) == is_global:
+                scopes.setdefault(scope, []).append(user)
+
+        for scope, users in scopes.items():
+            if is_global:
+                memberships = await self.db.Memberships.all()
+                group = self.db.user
+                guild = None
             else:
-                if requirements['Credits'] and bal < requirements['Credits']:
+                guild = self.bot.get_guild(scope)
+                if guild is None:
                     continue
-                elif (requirements['Role'] and requirements['Role'] not in
-                      [x.name for x in user.roles]):
+                memberships = await self.db.guild(guild).Memberships.all()
+                group = self.db.member
+            if not memberships:
+                continue
+            players = []
+            for user in users:
+                data = self.cache.players.get((scope, user.id)) or await group(user).all()
+                players.append((user, data))
+            await self.update_players(scope, memberships, players, _global=is_global,
+                                      sweep=False, guild=guild)
+
+    async def global_updater(self):
+        users = await self.db.all_users()
+        memberships = await self.db.Memberships.all()
+        if not users or not memberships:
+            return
+        players = [(self.bot.get_user(user), data) for user, data in users.items()]
+        await self.update_players(None, memberships, players, _global=True)
+
+    async def local_updater(self, only=None):
+        guilds = await self.db.all_guilds()
+        for guild, guild_data in guilds.items():
+            if only is not None and guild not in only:
+                continue
+            guild_obj = self.bot.get_guild(guild)
+            memberships = guild_data["Memberships"]
+            if not guild_obj or not memberships:
+                continue
+            users = await self.db.all_members(guild_obj)
+            players = [(guild_obj.get_member(user), data) for user, data in users.items()]
+            await self.update_players(guild, memberships, players, guild=guild_obj)
+
+    async def update_players(self, scope, memberships, players, _global=False, sweep=True,
+                             guild=None):
+        """
+
+        :param scope: None or guild id
+        :param memberships: Dictionary
+            The memberships of the scope.
+        :param players: List
+            (user or member object, player data) pairs. Players the bot can no longer see
+            are None and skipped.
+        :param _global: Boolean
+        :param sweep: Boolean
+            True when players holds every player of the scope.
+        :param guild: Guild object or None
+            The guild of the scope, None in global mode.
+        :return: None
+
+        Re-evaluates memberships from cached user objects, fetching balances in concurrent
+        batches. A player is only re-evaluated when their balance, roles or days of service
+        have changed since the last pass, or when the memberships themselves changed.
+
+        Players who have yet to serve the days a membership requires are queued for the
+        moment they will.
+        """
+        last, seen = self.fingerprints.get(scope, (None, {}))
+        if last != memberships:
+            seen = {}
+            self.index.invalidate(scope)
+        fingerprints = {} if sweep else seen
+        tiers = self.index.get(scope, memberships, guild)
+        thresholds = sorted(x.dos for x in tiers if x.dos)
+        loop = asyncio.get_event_loop()
+        players = [(user, data) for user, data in players if user is not None]
+
+        for idx in range(0, len(players), UPDATE_BATCH):
+            batch = players[idx:idx + UPDATE_BATCH]
+            try:
+                balances = await asyncio.gather(*(bank.get_balance(user) for user, data in batch))
+            except AttributeError:
+                raise RuntimeError("Casino is in global mode, while economy is in local mode. "
+                                   "Economy must be global if Casino is global. Either change "
+                                   "casino back to local or make your economy global.")
+            for (user, data), bal in zip(batch, balances):
+                current = data["Membership"]
+                if current["Assigned"] and current["Name"] in memberships:
                     continue
-                elif (requirements['DOS'] and requirements['DOS'] >
-                      (user.joined_at.now() - user.joined_at).days):
+                since = user.created_at if _global else user.joined_at
+                days = (since.now() - since).days
+                roles = frozenset() if _global else frozenset(x.id for x in user.roles)
+                fingerprint = (bal, roles, days)
+                previous = seen.get(user.id)
+                fingerprints[user.id] = fingerprint
+                # The loop clock and the wall clock drift apart, so a timer is only set
+                # again once the player's days changed or their last timer went off.
+                upcoming = next((x for x in thresholds if x > days), None)
+                if upcoming is not None and (previous != fingerprint or
+                                             (scope, user.id) not in self.updates.timers):
+                    due = since + datetime.timedelta(days=upcoming) - since.now()
+                    self.updates.schedule_at(loop.time() + due.total_seconds(), scope, user)
+                if previous == fingerprint and not current["Assigned"]:
                     continue
-                else:
-                    qualified.append((name, requirements['Access']))
+                membership = self.index.qualify(tiers, bal, roles, days)
+                if membership != current["Name"] or current["Assigned"]:
+                    await self.set_membership(scope, user, membership, _global)
+            await asyncio.sleep(0)
 
-        membership = max(qualified, key=itemgetter(1))[0] if qualified else 'Basic'
-        if _global:
-            async with self.db.user(user).Membership() as data:
-                data['Name'] = membership
-                data['Assigned'] = False
-        else:
-            async with self.db.member(user).Membership() as data:
-                data['Name'] = membership
-                data['Assigned'] = False
+        self.fingerprints[scope] = (memberships, fingerprints)
+
+    async def set_membership(self, scope, user, membership, _global=False):
+        # Pending writes go first, and a copy loaded during the write is dropped after it.
+        await self.cache.release((scope, user.id))
+        group = self.db.user(user) if _global else self.db.member(user)
+        await group.Membership.set({"Name": membership, "Assigned": False})
+        await self.cache.release((scope, user.id))
 
     @staticmethod
     async def basic_check(ctx, game, games, base):
@@ -845,6 +1194,11 @@ class Casino(Database, commands.Cog):
 
     def __unload(self):
         self.cycle_task.cancel()
+        self.flush_task.cancel()
+        self.bot.loop.create_task(self.cache.flush())
+        self.bot.loop.create_task(self.compact_counters())
+        sessions.detach()
+        audit.detach()
 
 
 class Membership(Database):
@@ -885,6 +1239,11 @@ class Membership(Database):
             await self.timeout
         except ExitProcess:
             await self.ctx.send(_("Process exited."))
+        finally:
+            await super().invalidate(self.ctx)
+            scope = await super().get_scope(self.ctx)
+            self.index.invalidate(scope)
+            self.updates.refresh(scope)
 
     async def delete(self):
         memberships = await self.coro.all()
@@ -1,7 +1,13 @@
+import time
 from copy import deepcopy
 from redbot.core import Config
 from collections import namedtuple
 
+from .stats import ScopeStats
+from .updater import MembershipIndex, MembershipQueue
+
+FLUSH_INTERVAL = 30
+
 user_defaults = {
     "Pending_Credits": 0,
     "Membership": {
@@ -43,10 +49,12 @@ user_defaults = {
         "War": 0,
         "Double": 0,
         "Pikapokeri": 0
-    }
+    },
+    "Cooldown_Epoch": 0
 }
 
 guild_defaults = {
+    "Cooldown_Epoch": 0,
     "Memberships": {},
     "Settings": {
         "Global": False,
@@ -143,15 +151,116 @@ guild_defaults = {
 member_defaults = deepcopy(user_defaults)
 global_defaults = deepcopy(guild_defaults)
 global_defaults["Settings"]["Global"] = True
+global_defaults["Secure_RNG"] = False
 
 
 _DataNamedTuple = namedtuple("Casino", "foo")
 _DataObj = _DataNamedTuple(foo=None)
 
 
+class Cache:
+    """In memory copy of casino settings and player records.
+
+    Settings are keyed by scope, which is None in global mode and the guild id in local
+    mode. Players are keyed by (scope, player id). Player writes only update the copy and
+    mark the changed path dirty. flush writes every dirty path back to Config in one pass,
+    so repeated writes to the same stat or cooldown between flushes become one write.
+
+    A cooldown that has run out by the time it would be written is skipped. Config then
+    holds an earlier claim of the same game, which has run out as well.
+    """
+
+    __slots__ = ('is_global', 'settings', 'players', 'maxsize', '_groups', '_dirty')
+
+    def __init__(self, maxsize=5000):
+        self.is_global = None
+        self.settings = {}
+        self.players = {}
+        self.maxsize = maxsize
+        self._groups = {}
+        self._dirty = {}
+
+    def load(self, key, group, data):
+        self.players[key] = data
+        self._groups[key] = group
+
+    def set(self, key, path, value):
+        data = self.players[key]
+        for part in path[:-1]:
+            data = data[part]
+        data[path[-1]] = value
+        self._dirty.setdefault(key, set()).add(path)
+
+    async def _write(self, key, paths):
+        group = self._groups[key]
+        now = time.time()
+        for path in paths:
+            value = self.players[key]
+            for part in path:
+                value = value[part]
+            if len(path) == 2 and path[0] == "Cooldowns" and value <= now:
+                continue
+            await group.set_raw(*path, value=value)
+
+    def _restore(self, key, paths):
+        # Paths dirtied again while the write was pending are already in _dirty.
+        self._dirty.setdefault(key, set()).update(paths)
+
+    async def flush(self):
+        """Writes every dirty path back to Config.
+
+        A player whose write fails stays dirty and the other players are still written.
+        The first error is raised once the pass is over.
+        """
+        dirty, self._dirty = self._dirty, {}
+        error = None
+        for key, paths in dirty.items():
+            try:
+                await self._write(key, paths)
+            except Exception as e:
+                self._restore(key, paths)
+                error = error or e
+
+        # Evict the oldest clean records once the cache outgrows its size.
+        for key in list(self.players)[:max(0, len(self.players) - self.maxsize)]:
+            if key not in self._dirty:
+                del self.players[key]
+                del self._groups[key]
+        if error is not None:
+            raise error
+
+    async def release(self, key):
+        """Writes back and forgets one player, before Config is accessed directly."""
+        paths = self._dirty.pop(key, None)
+        if paths:
+            try:
+                await self._write(key, paths)
+            except Exception:
+                self._restore(key, paths)
+                raise
+        self.players.pop(key, None)
+        self._groups.pop(key, None)
+
+    async def clear(self):
+        await self.flush()
+        self.drop()
+
+    def drop(self):
+        """Forgets everything without writing it back."""
+        self.is_global = None
+        self.settings.clear()
+        self.players.clear()
+        self._groups.clear()
+        self._dirty.clear()
+
+
 class Database:
 
     db = Config.get_conf(_DataObj, 5074395001, force_registration=True)
+    cache = Cache()
+    updates = MembershipQueue()
+    index = MembershipIndex()
+    counters = {}
 
     def __init__(self):
         self.db.register_guild(**guild_defaults)
@@ -162,7 +271,12 @@ class Database:
     async def casino_is_global(self):
         """Checks to see if the casino is storing data on
            a per server basis or globally."""
-        return await self.db.Settings.Global()
+        if self.cache.is_global is None:
+            self.cache.is_global = await self.db.Settings.Global()
+        return self.cache.is_global
+
+    async def get_scope(self, ctx):
+        return None if await self.casino_is_global() else ctx.guild.id
 
     async def get_data(self, ctx, player=None):
         """
@@ -173,7 +287,33 @@ class Database:
 
         Returns the appropriate config category based on the given
         data, and wheater or not the casino is global.
+
+        Callers of this read and write Config directly, so a cached
+        player is written back first. Callers that change the data
+        call invalidate once the write is done.
+        """
+        if player is not None:
+            await self.cache.release((await self.get_scope(ctx), player.id))
+        return await self._get_group(ctx, player)
+
+    async def invalidate(self, ctx, player=None):
         """
+
+        :param ctx: Context object
+        :param player: Member or user object
+        :return: None
+
+        Forgets the cached copy of data that was changed through get_data.
+        This has to wait until the write is done, or a concurrent read could
+        load the old value again in between.
+        """
+        scope = await self.get_scope(ctx)
+        if player is None:
+            self.cache.settings.pop(scope, None)
+        else:
+            await self.cache.release((scope, player.id))
+
+    async def _get_group(self, ctx, player=None):
         if await self.casino_is_global():
             if player is None:
                 return self.db
@@ -195,9 +335,96 @@ class Database:
         Returns a dictionary representation of casino's settings data
         and the player data.
         """
-        settings = await self.get_data(ctx)
-        player_data = await self.get_data(ctx, player=player)
-        return await settings.all(), await player_data.all()
+        return await self.get_settings(ctx), await self.get_player(ctx, player)
+
+    async def get_settings(self, ctx):
+        """
+
+        :param ctx: Context Object
+        :return: Dictionary
+
+        Returns the cached casino settings, loading them from Config on a miss.
+        The dictionary is shared, so it must not be modified.
+        """
+        scope = await self.get_scope(ctx)
+        try:
+            return self.cache.settings[scope]
+        except KeyError:
+            group = await self._get_group(ctx)
+            settings = self.cache.settings[scope] = await group.all()
+            return settings
+
+    async def get_player(self, ctx, player):
+        """
+
+        :param ctx: Context Object
+        :param player: Member or user object
+        :return: Dictionary
+
+        Returns the cached player data, loading it from Config on a miss.
+        Use set_player to change it.
+        """
+        key = (await self.get_scope(ctx), player.id)
+        try:
+            return self.cache.players[key]
+        except KeyError:
+            group = await self._get_group(ctx, player=player)
+            data = await group.all()
+            self.cache.load(key, group, data)
+            return data
+
+    async def set_player(self, ctx, player, *path, value):
+        """Changes a value in the cached player data. It is written to Config on the next flush."""
+        await self.get_player(ctx, player)
+        self.cache.set((await self.get_scope(ctx), player.id), path, value)
+
+    async def get_counters(self, ctx):
+        """
+
+        :param ctx: Context Object
+        :return: ScopeStats
+
+        Returns the Played and Won counters of the casino. The first call for a scope
+        loads the totals of every player in it.
+        """
+        scope = await self.get_scope(ctx)
+        try:
+            return self.counters[scope]
+        except KeyError:
+            pass
+        if scope is None:
+            players = await self.db.all_users()
+        else:
+            players = await self.db.all_members(ctx.guild)
+        counters = ScopeStats(user_defaults["Played"])
+        for player_id, data in players.items():
+            counters.load(player_id, data)
+        return self.counters.setdefault(scope, counters)
+
+    async def compact_counters(self):
+        """Writes the totals of every player who played since the last call to Config.
+
+        If a write fails or is cancelled, the players not written yet stay dirty, so the
+        next call writes them.
+        """
+        for scope, counters in list(self.counters.items()):
+            changed = counters.compact()
+            written = 0
+            try:
+                for player_id, played, won in changed:
+                    if scope is None:
+                        group = self.db.user_from_id(player_id)
+                    else:
+                        group = self.db.member_from_ids(scope, player_id)
+                    await group.Played.set(played)
+                    await group.Won.set(won)
+                    written += 1
+            finally:
+                counters.restore(x[0] for x in changed[written:])
+
+    def _reset_counters(self, scope, player):
+        if scope in self.counters:
+            self.counters[scope].reset(player.id)
 
     async def _wipe_casino(self, ctx):
         """
@@ -209,6 +436,10 @@ class Database:
         This wipes everything, including member/user data.
         """
         await self.db.clear_all()
+        self.cache.drop()
+        self.updates.clear()
+        self.index.clear()
+        self.counters.clear()
         msg = "{0.name} ({0.id}) wiped all casino data.".format(ctx.author)
         await ctx.send(msg)
 
@@ -218,6 +449,7 @@ class Database:
         """
         data = await self.get_data(ctx)
         await data.Settings.clear()
+        await self.invalidate(ctx)
         msg = ("{0.name} ({0.id}) reset all "
                "casino settings.").format(ctx.author)
         await ctx.send(msg)
@@ -228,6 +460,8 @@ class Database:
         """
         data = await self.get_data(ctx)
         await data.Memberships.clear()
+        await self.invalidate(ctx)
+        self.index.invalidate(await self.get_scope(ctx))
         msg = ("{0.name} ({0.id}) cleared "
                "all casino memberships.").format(ctx.author)
         await ctx.send(msg)
@@ -238,6 +472,7 @@ class Database:
         """
         data = await self.get_data(ctx)
         await data.Games.clear()
+        await self.invalidate(ctx)
         msg = ("{0.name} ({0.id}) restored casino games to "
                "default settings.").format(ctx.author)
         await ctx.send(msg)
@@ -263,6 +498,8 @@ class Database:
         data = await self.get_data(ctx, player=player)
         await data.Played.clear()
         await data.Won.clear()
+        await self.invalidate(ctx, player=player)
+        self._reset_counters(await self.get_scope(ctx), player)
 
         msg = ("{0.name} ({0.id}) reset all stats for "
                "{1.name} ({1.id}).").format(ctx.author, player)
@@ -279,6 +516,8 @@ class Database:
         """
         data = await self.get_data(ctx, player=player)
         await data.clear()
+        await self.invalidate(ctx, player=player)
+        self._reset_counters(await self.get_scope(ctx), player)
 
         msg = ("{0.name} ({0.id}) reset all data "
                "for {1.name} ({1.id}).").format(ctx.author, player)
@@ -295,6 +534,7 @@ class Database:
         """
         data = await self.get_data(ctx, player=player)
         await data.Cooldowns.clear()
+        await self.invalidate(ctx, player=player)
 
         msg = ("{0.name} ({0.id}) reset all cooldowns "
                "for {1.name} ({1.id}).").format(ctx.author, player)
@@ -303,25 +543,27 @@ class Database:
     async def _reset_cooldowns(self, ctx):
         """
         Resets all game cooldowns for every player in the database.
+
+        Cooldowns are stored with the cooldown epoch they were claimed under, so
+        advancing the epoch expires all of them without touching any player.
         """
+        data = await self.get_data(ctx)
+        await data.Cooldown_Epoch.set(await data.Cooldown_Epoch() + 1)
+        await self.invalidate(ctx)
         if await self.casino_is_global():
-            for player in await self.db.all_users():
-                try:
-                    user = await ctx.bot.fetch_user(player)
-                except AttributeError:
-                    user = await ctx.bot.get_user_info(player)
-                await self.db.user(user).Cooldowns.clear()
             msg = ("{0.name} ({0.id}) reset all "
                    "global cooldowns.").format(ctx.author)
         else:
-            for player in await self.db.all_members(ctx.guild):
-                user = ctx.guild.get_member(player)
-                await self.db.member(user).Cooldowns.clear()
             msg = ("{0.name} ({0.id}) reset all "
                    "cooldowns on {1.name}.").format(ctx.author, ctx.guild)
 
         await ctx.send(msg)
 
+    @staticmethod
+    def cooldowns_current(settings, player_data):
+        """False when the player's cooldowns were claimed before the last reset."""
+        return player_data["Cooldown_Epoch"] == settings["Cooldown_Epoch"]
+
     async def change_mode(self, mode):
         """
 
@@ -331,6 +573,10 @@ class Database:
         Toggles how data is stored for casino between local and global.
         When switching modes, all perviously stored data will be deleted.
         """
+        self.cache.drop()
+        self.updates.clear()
+        self.index.clear()
+        self.counters.clear()
         if mode == 'global':
             await self.db.clear_all_members()
             await self.db.clear_all_guilds()
@@ -339,10 +585,12 @@ class Database:
             await self.db.clear_all_users()
             await self.db.clear_all_globals()
             await self.db.Settings.Global.set(False)
+        # Anything loaded while the data was being cleared is stale.
+        self.cache.drop()
+        self.cache.is_global = mode == 'global'
 
     async def _update_cooldown(self, ctx, game, time):
-        player_data = await self.get_data(ctx, player=ctx.author)
-        await player_data.set_raw("Cooldowns", game, value=time)
+        await self.set_player(ctx, ctx.author, "Cooldowns", game, value=time)
 
     async def _get_player_membership(self, ctx, player):
         """
@@ -357,16 +605,15 @@ class Database:
         default.
         """
         basic = {"Reduction": 0, "Access": 0, "Color": "grey", "Bonus": 1}
-        player_data = await self.get_data(ctx, player=player)
-        name = await player_data.Membership.Name()
+        player_data = await self.get_player(ctx, player)
+        name = player_data["Membership"]["Name"]
         if name == "Basic":
             return name, basic
 
-        data = await self.get_data(ctx)
-        memberships = await data.Memberships.all()
+        settings = await self.get_settings(ctx)
         try:
-            return name, memberships[name]
+            return name, settings["Memberships"][name]
         except KeyError:
-            await player_data.Membership.set({"Name": "Basic",
-                                              "Assigned": False})
+            await self.set_player(ctx, player, "Membership", value={"Name": "Basic",
+                                                                     "Assigned": False})
             return "Basic", basic
@@ -1,116 +1,276 @@
 import random
+from array import array
 from collections import deque
-from itertools import product, chain
+from contextlib import contextmanager
+
+
+# Cards are stored as small integers from 0 to 51. The rank index is card >> 2 and the
+# suit index is card & 3. The lookup tables below are 256 bytes long so a whole hand can
+# be translated at once with bytes.translate.
+RANKS = (2, 3, 4, 5, 6, 7, 8, 9, 10, 'Jack', 'Queen', 'King', 'Ace')
+SUITS = (":clubs:", ":diamonds:", ":hearts:", ":spades:")
+SUIT_SYMBOLS = ("\u2663", "\u2666", "\u2665", "\u2660")
+
+_RANK = bytes(x >> 2 for x in range(256))
+_SUIT = bytes(x & 3 for x in range(256))
+_BJ = bytes(1 if x >> 2 == 12 else min((x >> 2) + 2, 10) for x in range(256))
+_WAR = bytes((x >> 2) + 2 for x in range(256))
+_NAMES = tuple('{} {}'.format(RANKS[x >> 2], SUITS[x & 3]) for x in range(52))
 
 
 class Deck:
-    """Creates a Deck of playing cards."""
-    suites = (":clubs:", ":diamonds:", ":hearts:", ":spades:")
+    """Creates a Deck of playing cards, or a shoe of several decks.
+
+    The shoe is an array of card integers, see the module level tables for the encoding.
+    Cards only become text in fmt_hand and fmt_card, when they are put into an embed.
+
+    The array is allocated once and refilled and shuffled in place by new, so a seeded
+    generator always deals the same cards. Cards are never removed from it: the cards
+    left are those between _bottom and _top, so dealing and burning only move an index.
+    A shoe has a cut card placed at the given penetration. Once it comes out, cut is
+    True and next_round reshuffles before the next round, so a shoe kept between rounds
+    is not reshuffled in the middle of a hand.
+    """
+    suites = SUITS
+    ranks = RANKS
     face_cards = ('King', 'Queen', 'Jack', 'Ace')
-    bj_vals = {'Jack': 10, 'Queen': 10, 'King': 10, 'Ace': 1}
-    war_values = {'Jack': 11, 'Queen': 12, 'King': 13, 'Ace': 14}
 
-    def __init__(self):
-        self._deck = deque()
+    def __init__(self, rng=None, decks=1, penetration=1.0):
+        self.rng = rng or random
+        self.size = 52 * decks
+        self._fresh = array('B', range(52)) * decks
+        self._deck = array('B')
+        self._top = 0
+        self._bottom = 0
+        # Cards left behind the cut card.
+        self._reserve = int(self.size * (1 - penetration))
 
     def __len__(self):
-        return len(self._deck)
+        return self._top - self._bottom
 
     def __str__(self):
-        return 'Standard deck of cards with {} cards remaining.'.format(len(self._deck))
+        return 'Standard deck of cards with {} cards remaining.'.format(len(self))
 
     def __repr__(self):
-        return 'Deck{!r}'.format(self._deck)
+        return 'Deck{!r}'.format(self._deck[self._bottom:self._top])
+
+    def __bytes__(self):
+        return self._deck[self._bottom:self._top].tobytes()
 
     @property
     def deck(self):
-        if len(self._deck) < 1:
+        if len(self) < 1:
             self.new()
-        return self._deck
+        return self._deck[self._bottom:self._top]
+
+    @property
+    def cut(self):
+        """True once the cut card has been dealt."""
+        return len(self) <= self._reserve
 
     def shuffle(self):
-        random.shuffle(self._deck)
+        if self._bottom == 0 and self._top == len(self._deck):
+            self.rng.shuffle(self._deck)
+        else:
+            cards = self._deck[self._bottom:self._top]
+            self.rng.shuffle(cards)
+            self._deck[self._bottom:self._top] = cards
+
+    @staticmethod
+    def card(suit, rank):
+        return RANKS.index(rank) << 2 | SUITS.index(suit)
 
-    def war_count(self, card):
+    @classmethod
+    def parse_card(cls, text: str):
+        """Parses a card written as 'suit rank', e.g. ':clubs: Ace' or '\u2663 10'."""
+        suit, rank = text.strip().rsplit(' ', 1)
+        if suit in SUIT_SYMBOLS:
+            suit = SUITS[SUIT_SYMBOLS.index(suit)]
         try:
-            return self.war_values[card[1]]
-        except KeyError:
-            return card[1]
+            return cls.card(suit, int(rank) if rank.isdigit() else rank.title())
+        except ValueError:
+            raise ValueError('Invalid card input.')
+
+    @staticmethod
+    def rank(card):
+        return RANKS[card >> 2]
+
+    @staticmethod
+    def suit(card):
+        return SUITS[card & 3]
 
-    def bj_count(self, hand: list, hole=False):
-        hand = self._hand_type(hand)
+    @staticmethod
+    def ranks_of(hand):
+        """Rank indexes (0 for a two, 12 for an ace) of every card in the hand."""
+        return bytes(hand).translate(_RANK)
+
+    @staticmethod
+    def suits_of(hand):
+        """Suit indexes of every card in the hand."""
+        return bytes(hand).translate(_SUIT)
+
+    @staticmethod
+    def war_count(card):
+        return _WAR[card]
+
+    @staticmethod
+    def bj_value(card):
+        """Blackjack value of a card, counting an ace as one."""
+        return _BJ[card]
+
+    @staticmethod
+    def bj_count(hand: list, hole=False):
         if hole:
-            card = hand[0][1]
-            count = self.bj_vals[card] if isinstance(card, str) else card
+            count = _BJ[hand[0]]
             return count if count > 1 else 11
 
-        count = sum([self.bj_vals[y] if isinstance(y, str) else y for x, y in hand])
-        if any('Ace' in pair for pair in hand) and count <= 11:
+        values = bytes(hand).translate(_BJ)
+        count = sum(values)
+        if 1 in values and count <= 11:
             count += 10
         return count
 
+    @staticmethod
+    def bj_soft(hand: list):
+        """True when an ace in the hand is being counted as 11."""
+        values = bytes(hand).translate(_BJ)
+        return 1 in values and sum(values) <= 11
+
     @staticmethod
     def fmt_hand(hand: list):
-        return ['{} {}'.format(y, x) for x, y in hand]
+        return [_NAMES[x] for x in hand]
 
     @staticmethod
     def fmt_card(card):
-        return '{1} {0}'.format(*card)
+        return _NAMES[card]
 
     @staticmethod
     def hand_check(hand: list, card):
-        return any(x[1] == card for x in hand)
+        return RANKS.index(card) in Deck.ranks_of(hand)
 
     def split(self, position: int):
-        self._deck.rotate(-position)
-
-    @staticmethod
-    def _true_hand(hand: list):
-        return [x.split(' ') for x in hand]
+        cards = self._deck[self._bottom:self._top]
+        self._deck[self._bottom:self._top] = cards[-position:] + cards[:-position]
 
     def draw(self, top=True):
         self._check()
 
         if top:
-            card = self._deck.popleft()
-        else:
-            card = self._deck.pop()
-        return card
+            self._top -= 1
+            return self._deck[self._top]
+        self._bottom += 1
+        return self._deck[self._bottom - 1]
 
     def _check(self, num=1):
-        if num > 52:
+        if num > self.size:
             raise ValueError('Can not exceed deck limit.')
-        if len(self._deck) < num:
+        if len(self) < num:
             self.new()
 
-    def _hand_type(self, hand: list):
-        if isinstance(hand[0], tuple):
-            return hand
-
-        try:
-            return self._true_hand(hand)
-        except ValueError:
-            raise ValueError('Invalid hand input.')
-
     def deal(self, num=1, top=True, hand=None):
         self._check(num=num)
 
         if hand is None:
             hand = []
-        for x in range(0, num):
-            if top:
-                hand.append(self._deck.popleft())
-            else:
-                hand.append(self._deck.pop())
+        if top:
+            hand.extend(reversed(self._deck[self._top - num:self._top]))
+            self._top -= num
+        else:
+            hand.extend(self._deck[self._bottom:self._bottom + num])
+            self._bottom += num
 
         return hand
 
     def burn(self, num):
         self._check(num=num)
-        for x in range(0, num):
-            del self._deck[0]
+        self._top -= num
 
     def new(self):
-        cards = product(self.suites, chain(range(2, 11), ('King', 'Queen', 'Jack', 'Ace')))
-        self._deck = deque(cards)
+        if len(self._deck) != self.size:
+            self._deck = array('B', self._fresh)
+        else:
+            self._deck[:] = self._fresh
+        self._top = self.size
+        self._bottom = 0
         self.shuffle()
+
+    def next_round(self):
+        """Reshuffles the shoe if the cut card came out during the last round."""
+        if self.cut or len(self) < 1:
+            self.new()
+
+
+class HandValue:
+    """The blackjack count of a hand, kept up to date as cards are added.
+
+    hard counts every ace as one. One ace is counted as eleven whenever that does not
+    bust the hand, which makes the hand soft.
+    """
+    __slots__ = ('hard', 'ace')
+
+    def __init__(self, hand=()):
+        self.hard = 0
+        self.ace = False
+        for card in hand:
+            self.add(card)
+
+    def add(self, card):
+        value = _BJ[card]
+        self.hard += value
+        self.ace = self.ace or value == 1
+
+    @property
+    def soft(self):
+        return self.ace and self.hard <= 11
+
+    @property
+    def count(self):
+        return self.hard + 10 if self.soft else self.hard
+
+
+class DeckPool:
+    """Hands out an isolated deck for every game session.
+
+    Sessions are keyed by (guild id, player id, session id), where the session id is the
+    id of the message that started the game. Decks from finished sessions are kept on an
+    idle stack and handed to the next session with a fresh shuffle, so concurrent games
+    never draw from or reshuffle each other's cards.
+    """
+
+    def __init__(self, size=64, rng=None):
+        self._sessions = {}
+        self._idle = deque(maxlen=size)
+        self.rng = rng
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @staticmethod
+    def key(ctx):
+        guild = ctx.guild.id if ctx.guild else None
+        return guild, ctx.author.id, ctx.message.id
+
+    def get(self, key):
+        return self._sessions[key]
+
+    def acquire(self, key):
+        try:
+            deck = self._idle.pop()
+        except IndexError:
+            deck = Deck(self.rng)
+        deck.new()
+        self._sessions[key] = deck
+        return deck
+
+    def release(self, key):
+        deck = self._sessions.pop(key, None)
+        if deck is not None:
+            self._idle.append(deck)
+
+    @contextmanager
+    def session(self, ctx):
+        key = self.key(ctx)
+        try:
+            yield self.acquire(key)
+        finally:
+            self.release(key)
@@ -1,14 +1,19 @@
 # Standard Library
+import asyncio
 import calendar
+import weakref
 from functools import wraps
 
 # Casino
-from . import utils
+from . import templates, utils
+from .audit import audit
 from .data import Database
+from .rng import rng
+from .sessions import sessions
 
 # Red
 from redbot.core import bank
-from redbot.core.i18n import Translator
+from redbot.core.i18n import Translator, get_locale
 
 # Discord
 import discord
@@ -16,18 +21,132 @@ import discord
 _ = Translator("Casino", __file__)
 
 
-def game_engine(name=None, choice=None, choices=None):
+def game_engine(name=None, choice=None, choices=None, batch=False):
     def wrapper(coro):
         @wraps(coro)
         async def wrapped(*args, **kwargs):
-            engine = GameEngine(name, choice, choices, args[1], args[2])
-            if await engine.check_conditions():
-                result = await coro(*args, **kwargs)
-                await engine.game_teardown(result)
+            hands = args[3] if batch else 1
+            engine = GameEngine(name, choice, choices, args[1], args[2], hands)
+            async with await engine.lock():
+                if await engine.check_conditions():
+                    try:
+                        with rng.round() as round_:
+                            result = await coro(*args, **kwargs)
+                        await engine.game_teardown(result)
+                        audit.record(engine, coro.__qualname__, args[2:], round_)
+                    finally:
+                        await engine.transaction.commit()
+                        sessions.close(engine.ctx)
+                        engine.updates.schedule(engine.transaction.key[0], engine.player)
         return wrapped
     return wrapper
 
 
+class PlayerLocks:
+    """One asyncio lock per player, so a player only ever has one game running.
+
+    Locks are keyed like cached player records, (scope, player id), and held weakly.
+    A lock is only alive while a game holds or waits on it, so idle players cost nothing.
+    """
+    __slots__ = ('_locks',)
+
+    def __init__(self):
+        self._locks = weakref.WeakValueDictionary()
+
+    def get(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+
+class BetTransaction:
+    """Everything a single bet reads and writes.
+
+    The settings, player record and membership perks are loaded once when the bet
+    starts. The cooldown is claimed in the cache the moment the bet validates, with no
+    await in between, so a second command from the same player sees it and is turned
+    away. Stat and payout changes are staged and applied together by commit when the
+    game ends.
+
+    Attributes
+    -----------
+    key: tuple
+        The (scope, player id) key of the player in the cache.
+    counters: ScopeStats
+        The Played and Won counters of the scope.
+    settings: dict
+        The cached casino settings.
+    player_data: dict
+        The cached player record.
+    membership: str
+        The name of the player's membership.
+    perks: dict
+        The perks of the player's membership.
+    """
+    __slots__ = ('cache', 'key', 'group', 'counters', 'settings', 'player_data', 'membership',
+                 'perks', 'staged', 'claimed')
+
+    basic = {"Reduction": 0, "Access": 0, "Color": "grey", "Bonus": 1}
+
+    def __init__(self, cache, key, counters, settings, player_data):
+        self.cache = cache
+        self.key = key
+        self.group = cache._groups[key]
+        self.counters = counters
+        self.settings = settings
+        self.player_data = player_data
+        self.staged = {}
+        self.claimed = {}
+        self.membership = player_data["Membership"]["Name"]
+        try:
+            self.perks = self.basic if self.membership == "Basic" else \
+                settings["Memberships"][self.membership]
+        except KeyError:
+            # The membership was deleted, so the player falls back to Basic.
+            self.membership, self.perks = "Basic", self.basic
+            self.stage("Membership", value={"Name": "Basic", "Assigned": False})
+
+    def get(self, *path):
+        value = self.player_data
+        for part in path:
+            value = value[part]
+        return value
+
+    async def _reload(self):
+        # The record can be released from the cache while the game is played.
+        if self.key not in self.cache.players:
+            self.cache.load(self.key, self.group, await self.group.all())
+        self.player_data = self.cache.players[self.key]
+
+    def claim(self, *path, value):
+        """Writes a value to the cache right away, remembering the old one for rollback."""
+        self.claimed.setdefault(path, self.get(*path))
+        self.cache.set(self.key, path, value)
+
+    async def rollback(self):
+        await self._reload()
+        for path, value in self.claimed.items():
+            self.cache.set(self.key, path, value)
+        self.claimed.clear()
+
+    def stage(self, *path, value):
+        self.staged[path] = value
+
+    def increment(self, *path, times=1):
+        self.staged[path] = self.staged.get(path, 0) + times
+
+    async def commit(self):
+        await self._reload()
+        for path, value in self.staged.items():
+            if path[0] in ("Played", "Won"):
+                if value:
+                    self.counters.record(self.key[1], *path, count=value)
+            else:
+                self.cache.set(self.key, path, value)
+        self.staged.clear()
+
+
 class GameEngine(Database):
     """A class that handles setup and teardown for games.
 
@@ -58,20 +177,37 @@ class GameEngine(Database):
             from config.
         bet: int
             The amount the player has wagered.
+        hands: int
+            The number of hands played at once, each for the bet. A batch game returns the
+            number of hands won instead of True or False.
+        won, amount: int
+            The outcome returned by the game, once it is over.
+        payout: int
+            The credits paid out for the game, or held pending over the payout limit.
 
     """
-    __slots__ = ('game', 'choice', 'choices', 'ctx', 'bet', 'player', 'guild')
+    __slots__ = ('game', 'choice', 'choices', 'ctx', 'bet', 'hands', 'player', 'guild',
+                 'transaction', 'won', 'amount', 'payout')
+
+    locks = PlayerLocks()
 
-    def __init__(self, game, choice, choices, ctx, bet):
+    def __init__(self, game, choice, choices, ctx, bet, hands=1):
         self.game = game
         self.choice = choice
         self.choices = choices
         self.bet = bet
+        self.hands = hands
         self.ctx = ctx
         self.player = ctx.author
         self.guild = ctx.guild
+        self.transaction = None
+        self.won = self.amount = self.payout = 0
         super().__init__()
 
+    async def lock(self):
+        """Returns the lock serialising this player's games."""
+        return self.locks.get((await super().get_scope(self.ctx), self.player.id))
+
     async def check_conditions(self):
         """
 
@@ -89,10 +225,16 @@ class GameEngine(Database):
         Cooldowns must be checked last so that the game doesn't trigger a cooldown if another
         condition has failed.
 
+        The player record is loaded last, and from there until the cooldown is claimed
+        nothing is awaited, so concurrent bets from one player can not both pass.
 
         """
+        balance = await bank.get_balance(self.player)
+        key = (await super().get_scope(self.ctx), self.player.id)
+        counters = await super().get_counters(self.ctx)
         settings, player_data = await super().get_all(self.ctx, self.player)
-        access = self.access_calculator(settings['Memberships'], player_data["Membership"]["Name"])
+        txn = self.transaction = BetTransaction(self.cache, key, counters, settings, player_data)
+        access = txn.perks["Access"]
 
         if not settings["Settings"]["Casino_Open"]:
             error = _("The Casino is closed.")
@@ -115,56 +257,66 @@ class GameEngine(Database):
                       "{} and {}.".format(settings['Games'][self.game]['Min'],
                                           settings['Games'][self.game]['Max']))
 
-        elif not await bank.can_spend(self.player, self.bet):
+        elif balance < self.bet * self.hands:
             error = _("You do not have enough credits to cover the bet.")
 
         else:
-            error = await self.check_cooldown(settings['Games'][self.game], player_data)
+            error = self.check_cooldown(settings['Games'][self.game], txn)
+
+        if not error:
+            try:
+                await bank.withdraw_credits(self.player, self.bet * self.hands)
+            except ValueError:
+                await txn.rollback()
+                error = _("You do not have enough credits to cover the bet.")
 
         if error:
             await self.ctx.send(error)
             return False
         else:
-            await bank.withdraw_credits(self.player, self.bet)
-            await self.update_stats(stat='Played')
+            sessions.open(self.ctx, self.bet * self.hands)
+            self.update_stats(stat='Played', times=self.hands)
             return True
 
-    async def update_stats(self, stat: str):
+    def update_stats(self, stat: str, times=1):
         """
 
         :param stat: string
             Must be Played or Won
+        :param times: int
+            The number of hands to count.
         :return: None
 
-        Updates either a player's win or played stat.
+        Stages an increment of either a player's win or played stat.
         """
-        instance = await self.get_data(self.ctx, player=self.player)
-        current = await instance.get_raw(stat, self.game)
-        await instance.set_raw(stat, self.game, value=current + 1)
+        self.transaction.increment(stat, self.game, times=times)
 
-    async def check_cooldown(self, game_data, player_data):
+    def check_cooldown(self, game_data, txn):
         """
 
         :param game_data: Dictionary
             Contains all the data pertaining to a particular game.
-        :param player_data: Object
-            User or member Object
+        :param txn: BetTransaction
+            The transaction of the current bet.
         :return: String or None
             Returns a string when a cooldown is remaining on a game, otherwise it will
             return None
 
         Checks the time a player last played a game, and compares it with the set cooldown
         for that game. If a user is still on cooldown, then a string detailing the time
-        remaining will be returned. Otherwise this will update their cooldown, and return None.
+        remaining will be returned. Otherwise this will claim their cooldown, and return None.
 
         """
-        user_time = player_data["Cooldowns"][self.game]
         now = calendar.timegm(self.ctx.message.created_at.utctimetuple())
+        if not self.cooldowns_current(txn.settings, txn.player_data):
+            # The cooldowns were reset after these were stored.
+            self.cache.set(txn.key, ("Cooldowns",), dict.fromkeys(txn.get("Cooldowns"), 0))
+            self.cache.set(txn.key, ("Cooldown_Epoch",), txn.settings["Cooldown_Epoch"])
+        user_time = txn.get("Cooldowns", self.game)
         base = game_data["Cooldown"]
-        membership = await super()._get_player_membership(self.ctx, self.player)
-        reduction = membership[1]["Reduction"]
+        reduction = txn.perks["Reduction"]
         if now >= user_time - reduction:
-            await super()._update_cooldown(self.ctx, self.game, now+base)
+            txn.claim("Cooldowns", self.game, value=now + base)
         else:
             seconds = int((user_time + reduction - now))
             remaining = utils.time_formatter(seconds)
@@ -173,28 +325,30 @@ class GameEngine(Database):
             return msg
 
     async def game_teardown(self, result):
-        data = await super().get_data(self.ctx)
-        settings = await data.all()
+        settings = self.transaction.settings
 
         win, amount, msg = result
+        self.won, self.amount = win, amount
+        # Settled before anything is paid, so a crash from here on is never refunded.
+        sessions.close(self.ctx)
 
         if not win:
             embed = await self.build_embed(msg, settings, win, total=amount, bonus="(+0)")
             return await self.ctx.send(self.player.mention, embed=embed)
 
-        player_data = await super().get_data(self.ctx, player=self.player)
-        await self.update_stats(stat='Won')
+        self.update_stats(stat='Won', times=int(win))
         if self.limit_check(settings, amount):
             embed = await self.build_embed(msg, settings, win, total=amount, bonus="(+0)")
-            return await self.limit_handler(embed, amount, player_data,
-                                            settings["Settings"]['Payout_Limit'])
+            self.payout = amount
+            return await self.limit_handler(embed, amount, settings["Settings"]['Payout_Limit'])
 
-        total, bonus = await self.deposit_winnings(amount, player_data, settings)
+        total, bonus = await self.deposit_winnings(amount, self.transaction, settings)
+        self.payout = total
         embed = await self.build_embed(msg, settings, win, total=total, bonus=bonus)
         return await self.ctx.send(self.player.mention, embed=embed)
 
-    async def limit_handler(self, embed, amount, player_instance, limit):
-        await player_instance.Pending_Credits.set(int(amount))
+    async def limit_handler(self, embed, amount, limit):
+        self.transaction.stage("Pending_Credits", value=int(amount))
 
         await self.ctx.send(self.player.mention, embed=embed)
         msg = _("{} Your winnings exceeded the maximum credit limit allowed ({}). The amount "
@@ -206,12 +360,13 @@ class GameEngine(Database):
 
         await self.player.send(msg)
 
-    async def deposit_winnings(self, amount, player_instance, settings):
+    async def deposit_winnings(self, amount, txn, settings):
         multiplier = settings['Games'][self.game]['Multiplier']
         if self.game == 'Allin' or self.game == 'Double' or self.game == "Pikapokeri":
-            return await bank.deposit_credits(self.player, amount), "(+0)"
+            await bank.deposit_credits(self.player, amount)
+            return amount, "(+0)"
         initial = round(amount * multiplier)
-        total, amt, msg = await self.calculate_bonus(initial, player_instance, settings)
+        total, amt, msg = self.calculate_bonus(initial, txn.membership, settings)
         await bank.deposit_credits(self.player, total)
         return total, msg
 
@@ -226,10 +381,12 @@ class GameEngine(Database):
 
     async def build_embed(self, msg, settings, win, total, bonus):
         balance = await bank.get_balance(self.player)
-        currency = await bank.get_currency_name(self.guild)
-        bal_msg = _("**Remaining Balance:** {} {}").format(balance, currency)
+        currency = await templates.currency.get(self.guild)
+        template = templates.result(get_locale(), settings['Settings']["Casino_Name"], self.game,
+                                    currency)
+        bal_msg = template.balance.format(balance)
         embed = discord.Embed()
-        embed.title = _("{} Casino | {}").format(settings['Settings']["Casino_Name"], self.game)
+        embed.title = template.title
 
         if isinstance(msg, discord.Embed):
             for field in msg.fields:
@@ -239,11 +396,10 @@ class GameEngine(Database):
 
         if win:
             embed.colour = 0x00FF00
-            end = _("Congratulations, you just won {} {} {}!\n"
-                    "{}").format(total, currency, bonus, bal_msg)
+            end = template.won.format(total, bonus, bal_msg)
         else:
             embed.colour = 0xFF0000
-            end = _("Sorry, you didn't win anything.\n{}").format(bal_msg)
+            end = template.lost.format(bal_msg)
         embed.add_field(name='-' * 65, value=end)
         return embed
 
@@ -260,8 +416,7 @@ class GameEngine(Database):
             return access
 
     @staticmethod
-    async def calculate_bonus(amount, player_instance, settings):
-        membership = await player_instance.Membership.Name()
+    def calculate_bonus(amount, membership, settings):
         try:
             bonus_multiplier = settings[membership]['Bonus']
         except KeyError:
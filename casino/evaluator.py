@@ -0,0 +1,89 @@
+# Standard Library
+from itertools import combinations_with_replacement
+
+# Casino
+from .deck import RANKS
+
+# Pikapokeri pay schedule, best hand first. The position of a hand in this
+# tuple is the category returned by evaluate().
+HANDS = (
+    (75, "Värisuora"),
+    (50, "4 Samaa"),
+    (20, "Täyskäsi"),
+    (15, "Väri"),
+    (11, "Suora"),
+    (5, "Kolmoset"),
+    (3, "Kaksi paria"),
+    (2, "10-A Pari"),
+    (0, "Köyhää"),
+)
+
+(STRAIGHT_FLUSH, FOUR_KIND, FULL_HOUSE, FLUSH, STRAIGHT,
+ THREE_KIND, TWO_PAIRS, HIGH_PAIR, NOTHING) = range(len(HANDS))
+
+# Every rank owns a 3 bit counter in the encoded hand, so the sum of the card
+# shifts is the rank count vector of the hand. The lowest bit is the flush flag.
+_RANK_SHIFT = tuple(1 << (3 * (x >> 2) + 1) for x in range(52))
+_SUIT_BIT = tuple(1 << (x & 3) for x in range(52))
+_HIGH_PAIR = RANKS.index(10)
+
+
+def _classify(ranks, flush):
+    """Classifies a sorted tuple of rank indexes into a HANDS category.
+
+    This follows the old check_hand except for one payout change: a hand with a pair
+    below tens whose ranks span five values, such as 2-3-3-4-6, used to be paid as Suora
+    because the straight check counted cards rather than ranks. It is now Köyhää and
+    pays nothing. 27648 of the 2598960 five card hands are affected.
+    """
+    counts = sorted((ranks.count(x) for x in set(ranks)), reverse=True)
+    straight = len(counts) == 5 and ranks[4] - ranks[0] == 4
+
+    if flush and straight:
+        return STRAIGHT_FLUSH
+    elif counts[0] >= 4:
+        return FOUR_KIND
+    elif counts[:2] == [3, 2]:
+        return FULL_HOUSE
+    elif flush:
+        return FLUSH
+    elif straight:
+        return STRAIGHT
+    elif counts[0] == 3:
+        return THREE_KIND
+    elif counts[:2] == [2, 2]:
+        return TWO_PAIRS
+    elif any(ranks.count(x) > 1 for x in ranks if x >= _HIGH_PAIR):
+        return HIGH_PAIR
+    return NOTHING
+
+
+def _build_table():
+    table = {}
+    for ranks in combinations_with_replacement(range(len(RANKS)), 5):
+        key = sum(1 << (3 * x + 1) for x in ranks)
+        table[key] = _classify(ranks, False)
+        table[key | 1] = _classify(ranks, True)
+    return table
+
+
+_TABLE = _build_table()
+
+
+def encode(hand):
+    """Packs a five card hand into a single integer.
+
+    Bits 1-39 hold a 3 bit count for every rank and bit 0 is set when
+    all five cards share a suit.
+    """
+    key = 0
+    suits = 0
+    for card in hand:
+        key += _RANK_SHIFT[card]
+        suits |= _SUIT_BIT[card]
+    return key | (suits & (suits - 1) == 0)
+
+
+def evaluate(hand):
+    """Returns the index in HANDS of the best category the hand qualifies for."""
+    return _TABLE[encode(hand)]
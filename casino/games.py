@@ -1,10 +1,15 @@
 # Standard Library
 import asyncio
-import random
 
 # Casino
-from .deck import Deck
+from . import templates
+from .deck import Deck, DeckPool, HandValue
+from .evaluator import HANDS, evaluate
 from .engine import game_engine
+from .prompts import prompts
+from .rng import rng
+from .sessions import sessions
+from .simulator import PIKAPOKERI
 
 # Red
 from redbot.core import bank
@@ -15,9 +20,11 @@ from redbot.core.utils.predicates import MessagePredicate
 # Discord
 import discord
 
-vs = [(':diamonds:', 10), (':diamonds:', "Jack"), (':diamonds:', "Queen"), (':diamonds:', "King"), (':diamonds:', "Ace")]
+# Third-Party Libraries
+from tabulate import tabulate
+
 _ = Translator("Casino", __file__)
-deck = Deck()
+decks = DeckPool(rng=rng.stream("Cards"))
 
 # Any game created must return a tuple of 3 arguments.
 # The outcome (True or False)
@@ -57,7 +64,7 @@ class Core:
             _("You put all your chips into the machine and pull the lever...")
         )
         await asyncio.sleep(3)
-        outcome = random.randint(0, multiplier + 1)
+        outcome = rng.stream("Allin").randint(0, multiplier + 1)
         if outcome == 0:
             msg = "▂▃▅▇█▓▒░ [♠]  [♥]  [♦]  [♣] ░▒▓█▇▅▃▂\n"
             msg += _("          CONGRATULATIONS YOU WON\n")
@@ -74,7 +81,7 @@ class Core:
     async def play_coin(self, ctx, bet, choice):
         await ctx.send(_("The coin flips into the air..."))
         await asyncio.sleep(2)
-        outcome = random.choice((_("heads"), _("tails")))
+        outcome = rng.stream("Coin").choice((_("heads"), _("tails")))
         msg = _("The coin landed on {}!").format(outcome)
         return choice.lower() in outcome, bet, msg
 
@@ -82,7 +89,7 @@ class Core:
     async def play_cups(self, ctx, bet, choice):
         await ctx.send(_("The cups start shuffling along the table..."))
         await asyncio.sleep(3)
-        outcome = random.randint(1, 3)
+        outcome = rng.stream("Cups").randint(1, 3)
         msg = _("The coin was under cup {}!").format(outcome)
         return int(choice) == outcome, bet, msg
 
@@ -153,7 +160,8 @@ class Core:
 
     @staticmethod
     def roll_dice():
-        return random.randint(1, 6), random.randint(1, 6)
+        dice = rng.stream("Dice")
+        return dice.randint(1, 6), dice.randint(1, 6)
 
 
 class Blackjack:
@@ -163,24 +171,33 @@ class Blackjack:
     can double down.
     """
 
+    # The hands of every game waiting on its player, keyed by (guild id, player id), so
+    # the hint command can look them up.
+    tables = {}
+
     def __init__(self):
         super().__init__()
 
     @game_engine(name="Blackjack")
     async def play(self, ctx, bet):
-        ph, dh, amt = await self.blackjack_game(ctx, bet)
-        result = await self.blackjack_results(ctx, amt, ph, dh)
+        with decks.session(ctx) as self.deck:
+            try:
+                ph, dh, amt = await self.blackjack_game(ctx, bet)
+            finally:
+                self.tables.pop((ctx.guild.id, ctx.author.id), None)
+            result = await self.blackjack_results(ctx, amt, ph, dh)
         return result
 
     @game_engine(name="Blackjack")
     async def mock(self, ctx, bet, ph, dh):
-        result = await self.blackjack_results(ctx, bet, ph, dh)
+        with decks.session(ctx) as self.deck:
+            result = await self.blackjack_results(ctx, bet, ph, dh)
         return result
 
     async def blackjack_game(self, ctx, amount):
-        ph = deck.deal(num=2)
-        ph_count = deck.bj_count(ph)
-        dh = deck.deal(num=2)
+        ph = self.deck.deal(num=2)
+        ph_count = self.deck.bj_count(ph)
+        dh = self.deck.deal(num=2)
 
         # End game if player has 21
         if ph_count == 21:
@@ -189,11 +206,13 @@ class Blackjack:
         condition1 = MessagePredicate.lower_contained_in(options, ctx=ctx)
         condition2 = MessagePredicate.lower_contained_in((_("hit"), _("stay")), ctx=ctx)
 
+        sessions.step(ctx, bytes(self.deck), bytes(ph), bytes(dh))
+        self.tables[(ctx.guild.id, ctx.author.id)] = ph, dh
         embed = self.bj_embed(ctx, ph, dh, ph_count, initial=True)
         await ctx.send(ctx.author.mention, embed=embed)
 
         try:
-            choice = await ctx.bot.wait_for("message", check=condition1, timeout=35.0)
+            choice = await prompts.wait(ctx, condition1, 35.0)
         except asyncio.TimeoutError:
             dh = self.dealer(dh)
             return ph, dh, amount
@@ -211,7 +230,11 @@ class Blackjack:
 
     async def double_down(self, ctx, ph, dh, amount, condition2):
         try:
-            await bank.withdraw_credits(ctx.author, amount)
+            if not rng.replaying():
+                await bank.withdraw_credits(ctx.author, amount)
+            elif rng.current().replies:
+                # The player was only asked again if they could not cover the double.
+                raise ValueError
         except ValueError:
             await ctx.send(
                 _("{} You can not cover the bet. Please choose " "hit or stay.").format(
@@ -220,9 +243,7 @@ class Blackjack:
             )
 
             try:
-                choice2 = await ctx.bot.wait_for(
-                    "message", check=condition2, timeout=35.0
-                )
+                choice2 = await prompts.wait(ctx, condition2, 35.0)
             except asyncio.TimeoutError:
                 return ph, dh, amount
 
@@ -230,18 +251,19 @@ class Blackjack:
                 dh = self.dealer(dh)
                 return ph, dh, amount
             elif choice2.content.lower() == _("hit"):
-                ph, dh = await self.bj_loop(ctx, ph, dh, deck.bj_count(ph), condition2)
+                ph, dh = await self.bj_loop(ctx, ph, dh, self.deck.bj_count(ph), condition2)
                 dh = self.dealer(dh)
                 return ph, dh, amount
         else:
-            deck.deal(hand=ph)
+            sessions.step(ctx, bytes(self.deck), bytes(ph), bytes(dh), stake=amount * 2)
+            self.deck.deal(hand=ph)
             dh = self.dealer(dh)
             amount *= 2
             return ph, dh, amount
 
     async def blackjack_results(self, ctx, amount, ph, dh):
-        dc = deck.bj_count(dh)
-        pc = deck.bj_count(ph)
+        dc = self.deck.bj_count(dh)
+        pc = self.deck.bj_count(ph)
 
         if dc > 21 >= pc or dc < pc <= 21:
             outcome = _("Winner!")
@@ -251,7 +273,8 @@ class Blackjack:
             result = False
         elif dc == pc <= 21:
             outcome = _("Pushed")
-            await bank.deposit_credits(ctx.author, amount)
+            if not rng.replaying():
+                await bank.deposit_credits(ctx.author, amount)
             result = False
         else:
             outcome = _("House Wins!")
@@ -261,15 +284,17 @@ class Blackjack:
 
     async def bj_loop(self, ctx, ph, dh, count, condition2):
         while count < 21:
-            ph = deck.deal(hand=ph)
-            count = deck.bj_count(hand=ph)
+            ph = self.deck.deal(hand=ph)
+            count = self.deck.bj_count(hand=ph)
+            sessions.step(ctx, bytes(self.deck), bytes(ph), bytes(dh),
+                          stake=0 if count > 21 else None)
 
             if count >= 21:
                 break
             embed = self.bj_embed(ctx, ph, dh, count)
             await ctx.send(ctx.author.mention, embed=embed)
             try:
-                resp = await ctx.bot.wait_for("message", check=condition2, timeout=35.0)
+                resp = await prompts.wait(ctx, condition2, 35.0)
             except asyncio.TimeoutError:
                 break
 
@@ -281,42 +306,37 @@ class Blackjack:
         # Return player hand & dealer hand when count >= 21 or the player picks stay.
         return ph, dh
 
-    @staticmethod
-    def dealer(dh):
-        count = deck.bj_count(dh)
+    def dealer(self, dh):
+        value = HandValue(dh)
         # forces hit if ace in first two cards without 21
-        if deck.hand_check(dh, "Ace") and count != 21:
-            deck.deal(hand=dh)
-            count = deck.bj_count(dh)
+        if value.ace and value.count != 21:
+            value.add(self.deck.deal(hand=dh)[-1])
 
         # defines maximum hit score X
-        while count < 16:
-            deck.deal(hand=dh)
-            count = deck.bj_count(dh)
+        while value.count < 16:
+            value.add(self.deck.deal(hand=dh)[-1])
         return dh
 
-    @staticmethod
-    def bj_embed(ctx, ph, dh, count1, initial=False, outcome=None):
-        hand = _("{}\n**Score:** {}")
-        footer = _("Cards in Deck: {}")
-        start = _("**Options:** hit, stay, or double")
-        after = _("**Options:** hit or stay")
-        options = "**Outcome:** " + outcome if outcome else start if initial else after
-        count2 = deck.bj_count(dh, hole=True) if not outcome else deck.bj_count(dh)
-        hole = " ".join(deck.fmt_hand([dh[0]]))
-        dealer_hand = hole if not outcome else ", ".join(deck.fmt_hand(dh))
+    def bj_embed(self, ctx, ph, dh, count1, initial=False, outcome=None):
+        text = templates.current()
+        hand = text.hand
+        options = "**Outcome:** " + outcome if outcome else \
+            text.bj_start if initial else text.bj_after
+        count2 = self.deck.bj_count(dh, hole=True) if not outcome else self.deck.bj_count(dh)
+        hole = " ".join(self.deck.fmt_hand([dh[0]]))
+        dealer_hand = hole if not outcome else ", ".join(self.deck.fmt_hand(dh))
 
         embed = discord.Embed(colour=0xFF0000)
         embed.add_field(
-            name=_("{}'s Hand").format(ctx.author.name),
-            value=hand.format(", ".join(deck.fmt_hand(ph)), count1),
+            name=text.hand_title.format(ctx.author.name),
+            value=hand.format(", ".join(self.deck.fmt_hand(ph)), count1),
         )
         embed.add_field(
-            name=_("{}'s Hand").format(ctx.bot.user.name),
+            name=text.hand_title.format(ctx.bot.user.name),
             value=hand.format(dealer_hand, count2),
         )
         embed.add_field(name="\u200b", value=options, inline=False)
-        embed.set_footer(text=footer.format(len(deck)))
+        embed.set_footer(text=text.deck_footer.format(len(self.deck)))
         return embed
 
 
@@ -325,7 +345,8 @@ class War:
 
     @game_engine("War")
     async def play(self, ctx, bet):
-        outcome, player_card, dealer_card, amount = await self.war_game(ctx, bet)
+        with decks.session(ctx) as self.deck:
+            outcome, player_card, dealer_card, amount = await self.war_game(ctx, bet)
         return await self.war_results(outcome, player_card, dealer_card, amount)
 
     async def war_game(self, ctx, bet):
@@ -355,13 +376,13 @@ class War:
                 "you can go to war.\nIf you go to war your bet will be doubled, "
                 "but the multiplier is only applied to your original bet, the rest will "
                 "be pushed."
-            ).format(deck.fmt_card(player_card))
+            ).format(self.deck.fmt_card(player_card))
         )
         pred = MessagePredicate.lower_contained_in(
             (_("war"), _("surrender"), _("ffs")), ctx=ctx
         )
         try:
-            choice = await ctx.bot.wait_for("message", check=pred, timeout=35.0)
+            choice = await prompts.wait(ctx, pred, 35.0)
         except asyncio.TimeoutError:
             return "Surrender", player_card, dealer_card, bet
 
@@ -387,7 +408,7 @@ class War:
     @staticmethod
     async def war_results(outcome, player_card, dealer_card, amount):
         msg = _("**Player Card:** {}\n**Dealer Card:** {}\n" "").format(
-            deck.fmt_card(player_card), deck.fmt_card(dealer_card)
+            Deck.fmt_card(player_card), Deck.fmt_card(dealer_card)
         )
         if outcome == "Win":
             msg += _("**Result**: Winner")
@@ -400,18 +421,17 @@ class War:
             msg += _("**Result**: Surrendered")
             return False, amount, msg
 
-    @staticmethod
-    def get_count(pc, dc):
-        return deck.war_count(pc), deck.war_count(dc)
+    def get_count(self, pc, dc):
+        return self.deck.war_count(pc), self.deck.war_count(dc)
 
     def war_draw(self):
-        player_card, dealer_card = deck.deal(num=2)
+        player_card, dealer_card = self.deck.deal(num=2)
         pc, dc = self.get_count(player_card, dealer_card)
         return player_card, dealer_card, pc, dc
 
     def burn_and_draw(self):
-        deck.burn(3)
-        player_card, dealer_card = deck.deal(num=2)
+        self.deck.burn(3)
+        player_card, dealer_card = self.deck.deal(num=2)
         pc, dc = self.get_count(player_card, dealer_card)
         return player_card, dealer_card, pc, dc
 
@@ -430,13 +450,15 @@ class Double:
         while bet > 0:
             count += 1
 
-            flip = random.randint(0, 1)
+            flip = rng.stream("Double").randint(0, 1)
 
             if flip == 0:
                 bet = 0
+                sessions.step(ctx, stake=bet)
                 break
             else:
                 bet *= 2
+                sessions.step(ctx, stake=bet)
 
             pred = MessagePredicate.lower_contained_in(
                 (_("double"), _("cash out")), ctx=ctx
@@ -445,7 +467,7 @@ class Double:
             embed = self.double_embed(ctx, count, bet)
             await ctx.send(ctx.author.mention, embed=embed)
             try:
-                resp = await ctx.bot.wait_for("message", check=pred, timeout=35.0)
+                resp = await prompts.wait(ctx, pred, 35.0)
             except asyncio.TimeoutError:
                 break
 
@@ -499,11 +521,42 @@ class Pikapokeri:
 
     @game_engine("Pikapokeri")
     async def play(self, ctx, bet):
-        amount, win, ph, msg = await self.play_pikapokeri(ctx, bet)
-        if amount > bet:
-            count, amount, win = await self.tuplaa(ctx,amount, msg,win)
+        with decks.session(ctx) as self.deck:
+            amount, win, ph, msg = await self.play_pikapokeri(ctx, bet)
+            if amount > bet:
+                count, amount, win = await self.tuplaa(ctx,amount, msg,win)
         return await self.pp_result(ctx, amount, win, ph, msg)
 
+    @game_engine("Pikapokeri", batch=True)
+    async def play_batch(self, ctx, bet, hands, option, doubles):
+        """Plays hands without asking anything, picking option cards with a PIKAPOKERI policy
+        and doubling up every paying hand the given number of times."""
+        choose = PIKAPOKERI[option]
+        counts = [0] * len(HANDS)
+        wins = amount = 0
+        with decks.session(ctx) as self.deck:
+            for x in range(hands):
+                self.deck.new()
+                ph = self.deck.deal(num=2)
+                op1 = self.deck.deal(num=1)
+                op2 = self.deck.deal(num=1)
+                ph += op1 if choose(ph, op1[0], op2[0]) == 1 else op2
+                ph += self.deck.deal(num=2)
+                category = evaluate(ph)
+                counts[category] += 1
+                payout = HANDS[category][0] * bet
+                if payout > bet:
+                    for y in range(doubles):
+                        card, pick = self.deck.deal(num=2)
+                        if self.deck.war_count(card) < self.deck.war_count(pick):
+                            payout *= 2
+                        else:
+                            payout = 0
+                            break
+                wins += payout > 0
+                amount += payout
+        return wins, amount, self.pp_batch_embed(ctx, bet, hands, counts, amount)
+
     async def pp_result(self, ctx, amount, win, ph, msg):
         embed = self.pp_embed(ctx, ph, amount, win, msg)
         return win, amount, embed
@@ -514,21 +567,21 @@ class Pikapokeri:
     
         while bet > 0:
             count += 1
-            deck.shuffle()
+            self.deck.shuffle()
             pred = MessagePredicate.lower_contained_in(
                 (_("1"), _("2")), ctx=ctx
             )
             embed = self.pp_tuplaus(ctx, msg, bet)
             await ctx.send(ctx.author.mention, embed=embed)
             try:
-                resp = await ctx.bot.wait_for("message", check=pred, timeout=35.0)
+                resp = await prompts.wait(ctx, pred, 35.0)
             except asyncio.TimeoutError:
                 break
 
             if resp.content.lower() == _("2"):
                 break
             else:
-                ph = deck.deal(num=1)
+                ph = self.deck.deal(num=1)
             
             pred = MessagePredicate.lower_contained_in(
                 (_("1"), _("2"), _("3"), _("4")), ctx=ctx
@@ -536,14 +589,14 @@ class Pikapokeri:
             embed = self.pp_tuplaa(ctx, ph)
             await ctx.send(ctx.author.mention, embed=embed)
             try:
-                resp = await ctx.bot.wait_for("message", check=pred, timeout=35.0)
+                resp = await prompts.wait(ctx, pred, 35.0)
             except asyncio.TimeoutError:
                 break
             
-            v1 = deck.deal(num=1)
-            v2 = deck.deal(num=1)
-            v3 = deck.deal(num=1)
-            v4 = deck.deal(num=1)
+            v1 = self.deck.deal(num=1)
+            v2 = self.deck.deal(num=1)
+            v3 = self.deck.deal(num=1)
+            v4 = self.deck.deal(num=1)
 
             if resp.content.lower() == _("1"):
                 ph2 = v1
@@ -561,43 +614,27 @@ class Pikapokeri:
             else:
                 win = False
                 bet = 0
+            sessions.step(ctx, bytes(self.deck), stake=bet)
 
         return count, bet, win
 
     async def check_win(self, card1, card2, ctx):
-        card_order_dict = {
-            2: 2,
-            3: 3,
-            4: 4,
-            5: 5,
-            6: 6,
-            7: 7,
-            8: 8,
-            9: 9,
-            10: 10,
-            "Jack": 11,
-            "Queen": 12,
-            "King": 13,
-            "Ace": 14,
-        }
-        value1 = card1[0][1]
-        rank_value = card_order_dict[value1]
-        value2 = card2[0][1]
-        rank_value2 = card_order_dict[value2]
-
-        footer = _("\nKortteja pakassa: {}")
+        rank_value = self.deck.war_count(card1[0])
+        rank_value2 = self.deck.war_count(card2[0])
+
+        text = templates.current()
         embed = discord.Embed(colour=0xFF0000)
         embed.add_field(
-            name=_("\nTuplaa"),
+            name=text.pp_double,
             value="Tuplaus",
             inline=False,
         )
         embed.add_field(
-            name=_("\nTulos"),
-            value="{} | {}".format(deck.fmt_hand(card1), deck.fmt_hand(card2)),
+            name=text.pp_result,
+            value="{} | {}".format(self.deck.fmt_hand(card1), self.deck.fmt_hand(card2)),
             inline=False,
         )
-        embed.set_footer(text=footer.format(len(deck)))
+        embed.set_footer(text=text.pp_footer.format(len(self.deck)))
         await ctx.send(ctx.author.mention, embed=embed)
         if rank_value < rank_value2:
             return True
@@ -607,285 +644,126 @@ class Pikapokeri:
 
 
     async def play_pikapokeri(self, ctx, bet):
-        ph = deck.deal(num=2)
-        op1 = deck.deal(num=1)
-        op2 = deck.deal(num=1)
+        ph = self.deck.deal(num=2)
+        op1 = self.deck.deal(num=1)
+        op2 = self.deck.deal(num=1)
         pred = MessagePredicate.lower_contained_in((_("1"), _("2")), ctx=ctx)
         embed = self.pp_mid(ctx, ph, op1, op2)
 
         await ctx.send(ctx.author.mention, embed=embed)
 
         try:
-            resp = await ctx.bot.wait_for("message", timeout=35.0, check=pred)
+            resp = await prompts.wait(ctx, pred, 35.0)
         except asyncio.TimeoutError:
-            print("User Timeout Pikapokeri")
-            resp = "test"
+            # A player who does not pick keeps the first card.
+            choice = _("1")
+        else:
+            choice = resp.content.lower()
 
-        if resp.content.lower() == _("1"):
+        if choice == _("1"):
             ph = ph + op1
         else:
             ph = ph + op2
 
-        ph = ph + deck.deal(num=2)
-        if ctx.author.id == 0x2f4436a11c20002 and ctx.author.is_on_mobile():
-            ph = vs
+        ph = ph + self.deck.deal(num=2)
         mulplr, result = await self.check_hand(ph)
         bet *= mulplr
+        sessions.step(ctx, bytes(self.deck), bytes(ph), stake=bet)
         win = True
         if result == "Köyhää":
             win = False
         return bet, win, ph, result
 
-    @staticmethod
-    def check_flush(self, hand):
-        suits = [i[0] for i in hand]
-        suits = sorted(suits)
-        if suits[0] == suits[1] == suits[2] == suits[3] == suits[4]:
-            return True
-        return False
-
-    @staticmethod
-    def check_fullhoyse(self, hand):
-        card_order_dict = {
-            2: 2,
-            3: 3,
-            4: 4,
-            5: 5,
-            6: 6,
-            7: 7,
-            8: 8,
-            9: 9,
-            10: 10,
-            "Jack": 11,
-            "Queen": 12,
-            "King": 13,
-            "Ace": 14,
-        }
-        values = [i[1] for i in hand]
-        rank_values = [card_order_dict[i] for i in values]
-        rank_values = sorted(rank_values)
-        if (rank_values[0] == rank_values[1] == rank_values[2] and rank_values[3] == rank_values[4]) or (
-            rank_values[0] == rank_values[1] and rank_values[2] == rank_values[3] == rank_values[4]
-        ):
-            return True
-        return False
-
-    @staticmethod
-    def check_one_pairs(self, hand):
-        card_order_dict = {
-            2: 2,
-            3: 3,
-            4: 4,
-            5: 5,
-            6: 6,
-            7: 7,
-            8: 8,
-            9: 9,
-            10: 10,
-            "Jack": 11,
-            "Queen": 12,
-            "King": 13,
-            "Ace": 14,
-        }
-        values = [i[1] for i in hand]
-        rank_values = [card_order_dict[i] for i in values]
-        pairs = list()
-        for value in rank_values:
-            if value in pairs:
-                return True
-            elif value > 9:
-                put = int(value)
-                pairs.append(put)
-        return False
-
-    @staticmethod
-    def check_3_kind(self, hand):
-        card_order_dict = {
-            2: 2,
-            3: 3,
-            4: 4,
-            5: 5,
-            6: 6,
-            7: 7,
-            8: 8,
-            9: 9,
-            10: 10,
-            "Jack": 11,
-            "Queen": 12,
-            "King": 13,
-            "Ace": 14,
-        }
-        values = [i[1] for i in hand]
-        card_values = [card_order_dict[i] for i in values]
-        card_values = sorted(card_values)
-        if card_values[0] == card_values[1] == card_values[2]:
-            return True
-        elif card_values[1] == card_values[2] == card_values[3]:
-            return True
-        elif card_values[2] == card_values[3] == card_values[4]:
-            return True
-        return False
-
-
-    @staticmethod
-    def check_4_kind(self, hand):
-        card_order_dict = {
-            2: 2,
-            3: 3,
-            4: 4,
-            5: 5,
-            6: 6,
-            7: 7,
-            8: 8,
-            9: 9,
-            10: 10,
-            "Jack": 11,
-            "Queen": 12,
-            "King": 13,
-            "Ace": 14,
-        }
-        values = [i[1] for i in hand]
-        card_values = [card_order_dict[i] for i in values]
-        card_values = sorted(card_values)
-        if card_values[0] == card_values[1] == card_values[2] == card_values[3]:
-            return True
-        elif card_values[4] == card_values[3] == card_values[2] == card_values[1]:
-            return True
-        return False
-
-    @staticmethod
-    def check_straight(self, hand):
-        card_order_dict = {
-            2: 2,
-            3: 3,
-            4: 4,
-            5: 5,
-            6: 6,
-            7: 7,
-            8: 8,
-            9: 9,
-            10: 10,
-            "Jack": 11,
-            "Queen": 12,
-            "King": 13,
-            "Ace": 14,
-        }
-        if self.check_one_pairs(self, hand):
-            return False
-        elif self.check_two_pairs(self,hand):
-            return False
-        elif self.check_3_kind(self,hand):
-            return False
-        values = [i[1] for i in hand]
-        rank_set = [card_order_dict[i] for i in values]
-        rank_range = max(rank_set) - min(rank_set) + 1
-        return rank_range == len(hand) and len(rank_set) == len(hand)
-
-    @staticmethod
-    def check_two_pairs(self, hand):
-        values = set()
-        pair = 0
-        for card in hand:
-            if card[1] in values:
-                pair = pair + 1
-                if pair > 1:
-                    return True
-            else:
-                values.add(card[1])
-        return False
-
     async def check_hand(self, hand):
-        if self.check_flush(self, hand) and self.check_straight(self, hand):
-            return 75, "Värisuora"
-        elif self.check_4_kind(self, hand):
-            return 50, "4 Samaa"
-        elif self.check_fullhoyse(self, hand):
-            return 20, "Täyskäsi"
-        elif self.check_flush(self, hand):
-            return 15, "Väri"
-        elif self.check_straight(self, hand):
-            return 11, "Suora"
-        elif self.check_3_kind(self, hand):
-            return 5, "Kolmoset"
-        elif self.check_two_pairs(self, hand):
-            return 3, "Kaksi paria"
-        elif self.check_one_pairs(self, hand):
-            return 2, "10-A Pari"
-        return 0, "Köyhää"
+        return HANDS[evaluate(hand)]
 
     @staticmethod
     def pp_embed(ctx, ph, amount, win, msg):
+        text = templates.current()
         embed = discord.Embed(colour=0xFF0000)
         embed.add_field(
-            name=_("{}n käsi").format(ctx.author.name),
-            value="{}".format(", ".join(deck.fmt_hand(ph))),
+            name=text.pp_hand.format(ctx.author.name),
+            value="{}".format(", ".join(Deck.fmt_hand(ph))),
         )
         if win == False:
-            embed.add_field(name=_("\nTulos"), value=("Kävi köyhää :("), inline=False)
+            embed.add_field(name=text.pp_result, value=("Kävi köyhää :("), inline=False)
         else:
             embed.add_field(
-                name=_("\nTulos {}").format(msg),
+                name=text.pp_result_of.format(msg),
                 value=("{} {} kolikkoa").format("\nVoitit", amount),
                 inline=False,
             )
         return embed
 
     @staticmethod
-    def pp_mid(ctx, ph, op1, op2):
-        footer = _("\nKortteja pakassa: {}")
+    def pp_batch_embed(ctx, bet, hands, counts, amount):
+        text = templates.current()
+        rows = [(label, count) for (pay, label), count in zip(HANDS, counts) if count]
         embed = discord.Embed(colour=0xFF0000)
         embed.add_field(
-            name=_("{}n käsi").format(ctx.author.name),
-            value="{}".format(", ".join(deck.fmt_hand(ph))),
+            name=text.pp_batch.format(ctx.author.name, hands),
+            value=box(tabulate(rows, tablefmt="plain"), lang="cpp"),
+        )
+        embed.add_field(
+            name=text.pp_result,
+            value=text.pp_batch_total.format(bet * hands, amount),
+            inline=False,
         )
+        return embed
 
+    def pp_mid(self, ctx, ph, op1, op2):
+        text = templates.current()
+        embed = discord.Embed(colour=0xFF0000)
         embed.add_field(
-            name=_("\nVaihtoehdot"),
-            value="**1** {} || **2** {}".format(deck.fmt_hand(op1), deck.fmt_hand(op2)),
+            name=text.pp_hand.format(ctx.author.name),
+            value="{}".format(", ".join(self.deck.fmt_hand(ph))),
+        )
+
+        embed.add_field(
+            name=text.pp_options,
+            value="**1** {} || **2** {}".format(self.deck.fmt_hand(op1), self.deck.fmt_hand(op2)),
             inline=False,
         )
-        embed.set_footer(text=footer.format(len(deck)))
+        embed.set_footer(text=text.pp_footer.format(len(self.deck)))
 
         return embed
 
 
-    @staticmethod
-    def pp_tuplaus(ctx, msg,amount):
-        footer = _("\nKortteja pakassa: {}")
+    def pp_tuplaus(self, ctx, msg,amount):
+        text = templates.current()
         embed = discord.Embed(colour=0xFF0000)
 
         embed.add_field(
-                name=_("\nTulos {}").format(msg),
+                name=text.pp_result_of.format(msg),
                 value=("{} {} kolikkoa").format("\nVoitit", amount),
                 inline=False,
             )
 
         embed.add_field(
-            name=_("\nVaihtoehdot"),
+            name=text.pp_options,
             value="**1** Tuplaa || **2** Voitot",
             inline=False,
         )
-        embed.set_footer(text=footer.format(len(deck)))
+        embed.set_footer(text=text.pp_footer.format(len(self.deck)))
 
         return embed
 
 
-    @staticmethod
-    def pp_tuplaa(ctx, card):
-        footer = _("\nKortteja pakassa: {}")
+    def pp_tuplaa(self, ctx, card):
+        text = templates.current()
         embed = discord.Embed(colour=0xFF0000)
 
         embed.add_field(
-            name=_("\nTuplaa"),
+            name=text.pp_double,
             value="Tuplaus",
             inline=False,
         )
 
         embed.add_field(
-            name=_("\nVaihtoehdot"),
-            value="{} | **1** | **2** | **3** | **4**".format(deck.fmt_hand(card)),
+            name=text.pp_options,
+            value="{} | **1** | **2** | **3** | **4**".format(self.deck.fmt_hand(card)),
             inline=False,
         )
-        embed.set_footer(text=footer.format(len(deck)))
+        embed.set_footer(text=text.pp_footer.format(len(self.deck)))
 
         return embed
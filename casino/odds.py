@@ -0,0 +1,275 @@
+# Standard Library
+from collections import namedtuple
+from functools import lru_cache
+from itertools import combinations
+
+# Casino
+from .deck import Deck, HandValue
+from .evaluator import HANDS, evaluate
+
+PayLine = namedtuple("PayLine", "multiplier label probability contribution")
+Hint = namedtuple("Hint", "stay hit double")
+
+_DECK = range(52)
+_PAYS = tuple(pay for pay, label in HANDS)
+
+# Hands are memoised on their suit pattern: the sorted tuple of the rank bitmask held in
+# each suit. Two hands share a key exactly when a relabelling of suits maps one onto the
+# other, and relabelling suits never changes how a hand is paid.
+_completions = {}
+_partials = {}
+
+
+def suit_key(hand):
+    masks = [0, 0, 0, 0]
+    for card in hand:
+        masks[card & 3] |= 1 << (card >> 2)
+    return tuple(sorted(masks))
+
+
+def _completion_counts(hand):
+    """Category counts over every fifth card that can complete a four card hand."""
+    key = suit_key(hand)
+    try:
+        return _completions[key]
+    except KeyError:
+        pass
+    counts = [0] * len(HANDS)
+    for card in _DECK:
+        if card not in hand:
+            counts[evaluate(hand + [card])] += 1
+    _completions[key] = counts
+    return counts
+
+
+def _pair_counts(hand):
+    """Category counts over every pair of cards that can complete a three card hand.
+
+    Each pair {a, b} is reached once through a and once through b, so the sum of the
+    four card completion counts is halved.
+    """
+    key = suit_key(hand)
+    try:
+        return _partials[key]
+    except KeyError:
+        pass
+    counts = [0] * len(HANDS)
+    for card in _DECK:
+        if card not in hand:
+            for idx, value in enumerate(_completion_counts(hand + [card])):
+                counts[idx] += value
+    counts = [x // 2 for x in counts]
+    _partials[key] = counts
+    return counts
+
+
+def _value(counts):
+    return sum(x * pay for x, pay in zip(counts, _PAYS))
+
+
+def best_option(hand, op1, op2):
+    """Returns 1 or 2, whichever option card gives the higher expected payout.
+
+    Both completions are dealt from a deck missing the same four cards, so the pairs that
+    contain the other option card cancel out and comparing the three card totals is enough.
+    """
+    first = _value(_pair_counts(hand + [op1]))
+    second = _value(_pair_counts(hand + [op2]))
+    return 1 if first >= second else 2
+
+
+@lru_cache(maxsize=1)
+def pikapokeri():
+    """Exact distribution of Pikapokeri hands when the option card is always chosen optimally.
+
+    Enumerates every two card start, every pair of option cards and every two card
+    completion of play_pikapokeri. Returns a PayLine per check_hand category and the
+    expected return per credit bet, before the double-up.
+    """
+    starts = {}
+    for hand in combinations(_DECK, 2):
+        key = suit_key(hand)
+        if key in starts:
+            starts[key][1] += 1
+        else:
+            starts[key] = [list(hand), 1]
+
+    totals = [0] * len(HANDS)
+    for hand, weight in starts.values():
+        rest = [x for x in _DECK if x not in hand]
+        for op1, op2 in combinations(rest, 2):
+            first = _pair_counts(hand + [op1])
+            second = _pair_counts(hand + [op2])
+            chosen = first if _value(first) >= _value(second) else second
+            dead = _completion_counts(hand + [op1, op2])
+            for idx in range(len(HANDS)):
+                totals[idx] += weight * (chosen[idx] - dead[idx])
+
+    paths = sum(totals)
+    lines = [PayLine(pay, label, total / paths, pay * total / paths)
+             for (pay, label), total in zip(HANDS, totals)]
+    return lines, sum(x.contribution for x in lines)
+
+
+# Blackjack is worked out on shoes: tuples of how many cards of each blackjack value, from
+# ace to ten, are left. Suits never matter, so every state with the same shoe is shared.
+# The dealer ends on a total of 16 to 21 or busts, which is index _BUST of a distribution.
+_FULL_SHOE = (4,) * 9 + (16,)
+_BUST = 6
+_OUTCOMES = tuple(tuple(float(x == idx) for x in range(_BUST + 1)) for idx in range(_BUST + 1))
+
+
+def shoe_of(cards):
+    """The shoe left once cards are taken from a full deck."""
+    shoe = list(_FULL_SHOE)
+    for card in cards:
+        shoe[Deck.bj_value(card) - 1] -= 1
+    return tuple(shoe)
+
+
+def _draws(shoe):
+    total = sum(shoe)
+    for value, left in enumerate(shoe, 1):
+        if left:
+            yield value, left / total, shoe[:value - 1] + (left - 1,) + shoe[value:]
+
+
+def _total(hard, ace):
+    return hard + 10 if ace and hard <= 11 else hard
+
+
+def _mix(result, p, distribution):
+    for idx, x in enumerate(distribution):
+        result[idx] += p * x
+
+
+def _dealer_hits(shoe, hard, ace, memo):
+    """Distribution of the dealer's final total when they hit below 16."""
+    count = _total(hard, ace)
+    if count >= 16:
+        return _OUTCOMES[min(count, 22) - 16]
+    key = (shoe, hard, ace)
+    try:
+        return memo[key]
+    except KeyError:
+        pass
+    result = [0.0] * (_BUST + 1)
+    for value, p, rest in _draws(shoe):
+        _mix(result, p, _dealer_hits(rest, hard + value, ace or value == 1, memo))
+    result = memo[key] = tuple(result)
+    return result
+
+
+@lru_cache(maxsize=1 << 16)
+def dealer(shoe, up):
+    """
+
+    :param shoe: Tuple
+        The cards the hole card and the dealer's hits are drawn from.
+    :param up: int
+        The blackjack value of the dealer's face up card.
+    :return: Tuple
+        The distribution of the dealer's final total, 16 to 21 then bust, and the
+        probability of a two card 21.
+
+    Follows Blackjack.dealer: a hand holding an ace that is not 21 takes one forced card,
+    then the dealer hits while below 16.
+    """
+    result = [0.0] * (_BUST + 1)
+    natural = 0.0
+    memo = {}
+    for value, p, rest in _draws(shoe):
+        hard, ace = up + value, up == 1 or value == 1
+        if _total(hard, ace) == 21:
+            natural += p
+        if ace and _total(hard, ace) != 21:
+            for forced, q, left in _draws(rest):
+                _mix(result, p * q, _dealer_hits(left, hard + forced, True, memo))
+        else:
+            _mix(result, p, _dealer_hits(rest, hard, ace, memo))
+    return tuple(result), natural
+
+
+def _stay(shoe, count, up, multiplier):
+    totals, natural = dealer(shoe, up)
+    win = totals[_BUST] + sum(totals[:max(0, count - 16)])
+    push = totals[count - 16] if count >= 16 else 0.0
+    return multiplier * win + push - 1
+
+
+def _hit(shoe, hard, ace, up, multiplier):
+    result = 0.0
+    for value, p, rest in _draws(shoe):
+        h, a = hard + value, ace or value == 1
+        count = _total(h, a)
+        if count > 21:
+            result -= p
+        elif count == 21:
+            # bj_loop stops asking at 21.
+            result += p * _stay(rest, count, up, multiplier)
+        else:
+            result += p * _best(rest, h, a, up, multiplier)
+    return result
+
+
+@lru_cache(maxsize=1 << 18)
+def _best(shoe, hard, ace, up, multiplier):
+    return max(_stay(shoe, _total(hard, ace), up, multiplier),
+               _hit(shoe, hard, ace, up, multiplier))
+
+
+def _double(shoe, hard, ace, up, multiplier):
+    result = 0.0
+    for value, p, rest in _draws(shoe):
+        count = _total(hard + value, ace or value == 1)
+        result += p * (-2 if count > 21 else 2 * _stay(rest, count, up, multiplier))
+    return result
+
+
+def blackjack_hint(hand, up, multiplier, first=False):
+    """
+
+    :param hand: List
+        The player's cards.
+    :param up: int
+        The dealer's face up card.
+    :param multiplier: float
+        The Blackjack multiplier of the casino.
+    :param first: bool
+        Whether the player may still double down.
+    :return: Hint
+        The expected net return per credit bet of staying, hitting and doubling down, with
+        double as None when it is not allowed.
+
+    Exact for the cards the player can see. The dealer's hole card and every later card are
+    drawn from the rest of the deck, and every later decision is the best one.
+    """
+    shoe = shoe_of(hand + [up])
+    value = HandValue(hand)
+    up = Deck.bj_value(up)
+    return Hint(_stay(shoe, value.count, up, multiplier),
+                _hit(shoe, value.hard, value.ace, up, multiplier),
+                _double(shoe, value.hard, value.ace, up, multiplier) if first else None)
+
+
+@lru_cache(maxsize=4)
+def blackjack(multiplier):
+    """Expected net return per credit of Blackjack when every decision is the best one.
+
+    Enumerates every player start and dealer face up card from a full deck. A player
+    dealt 21 wins at once unless the dealer also holds 21. Membership bonuses are not
+    included. The house edge is the negated return.
+    """
+    result = 0.0
+    for first, p1, shoe in _draws(_FULL_SHOE):
+        for second, p2, shoe2 in _draws(shoe):
+            for up, p3, rest in _draws(shoe2):
+                hard, ace = first + second, first == 1 or second == 1
+                if _total(hard, ace) == 21:
+                    natural = dealer(rest, up)[1]
+                    value = multiplier * (1 - natural) + natural - 1
+                else:
+                    value = max(_best(rest, hard, ace, up, multiplier),
+                                _double(rest, hard, ace, up, multiplier))
+                result += p1 * p2 * p3 * value
+    return result
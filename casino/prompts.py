@@ -0,0 +1,85 @@
+# Standard Library
+import asyncio
+from collections import namedtuple
+
+# Casino
+from .rng import rng
+
+# A recorded reply handed to a replayed round in place of a message.
+Reply = namedtuple("Reply", "content")
+
+
+class PromptDispatcher:
+    """Routes player replies to the game waiting for them.
+
+    bot.wait_for tests every incoming message against the check of every waiting game.
+    Here a waiting game is filed under the (channel id, author id) its reply must come
+    from, and the Casino on_message listener passes each message to dispatch, so a
+    message is only checked against the prompts of its own author in its own channel.
+    """
+
+    __slots__ = ('_waiting',)
+
+    def __init__(self):
+        self._waiting = {}
+
+    async def wait(self, ctx, check, timeout):
+        """
+
+        :param ctx: Context object
+            The context of the game. Only its author's messages in its channel are checked.
+        :param check: Callable
+            Takes a message and returns True when it answers the prompt.
+        :param timeout: float
+        :return: Message
+
+        Waits for the player to answer a prompt. Raises asyncio.TimeoutError like
+        bot.wait_for when no answer arrives in time. Answers are recorded in the current
+        round, and a replayed round is answered from its recording.
+        """
+        round_ = rng.current()
+        if rng.replaying():
+            # An empty recorded choice is a prompt that timed out.
+            reply = round_.replies.popleft() if round_.replies else ""
+            if not reply:
+                raise asyncio.TimeoutError
+            return Reply(reply)
+
+        key = (ctx.channel.id, ctx.author.id)
+        entry = (check, asyncio.get_event_loop().create_future())
+        self._waiting.setdefault(key, []).append(entry)
+        try:
+            message = await asyncio.wait_for(entry[1], timeout)
+        except asyncio.TimeoutError:
+            if round_ is not None:
+                round_.choices.append("")
+            raise
+        else:
+            if round_ is not None:
+                round_.choices.append(message.content)
+            return message
+        finally:
+            waiting = self._waiting[key]
+            waiting.remove(entry)
+            if not waiting:
+                del self._waiting[key]
+
+    def dispatch(self, message):
+        """Hands a message to the prompts waiting on it. True when one of them took it."""
+        waiting = self._waiting.get((message.channel.id, message.author.id))
+        if not waiting:
+            return False
+        answered = False
+        for check, future in waiting:
+            if future.done():
+                continue
+            try:
+                if check(message):
+                    future.set_result(message)
+                    answered = True
+            except Exception as e:
+                future.set_exception(e)
+        return answered
+
+
+prompts = PromptDispatcher()
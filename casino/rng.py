@@ -0,0 +1,173 @@
+# Standard Library
+import random
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Numbers drawn at once for each small range a stream is asked for.
+BUFFER = 1024
+# Ranges wider than this are drawn one number at a time.
+_BUFFERED_RANGE = 256
+
+# The round being played by the current task, if any.
+_round = ContextVar("round", default=None)
+
+
+class Round:
+    """The random numbers, shuffles and choices of one game round.
+
+    While a round is active, streams still draw from their own generators, but every
+    number they hand out is kept in numbers, every deck they shuffle in shuffles, and
+    every reply of the player in choices. Together these are enough to play the round
+    again exactly, whichever generator drew them.
+
+    A round being replayed hands out the recorded numbers and shuffles in their order
+    instead of drawing, and answers prompts from replies instead of waiting for the player.
+    """
+
+    __slots__ = ('numbers', 'shuffles', 'choices', 'replies', '_numbers', '_shuffles')
+
+    def __init__(self, numbers=None, shuffles=None, replies=None):
+        self.numbers = []
+        self.shuffles = []
+        self.choices = []
+        self.replies = None if replies is None else deque(replies)
+        self._numbers = deque(numbers or ())
+        self._shuffles = deque(shuffles or ())
+
+
+class Stream:
+    """The random numbers of one game.
+
+    Small integer ranges, such as dice and coin flips, are drawn BUFFER numbers at a
+    time with a single call to choices and handed out from the end of the list. choices
+    consumes the generator differently from randint, so the numbers a seed gives depend
+    on BUFFER and _BUFFERED_RANGE as well as on the order the game asks for them.
+    """
+
+    __slots__ = ('name', 'rng', '_buffers')
+
+    def __init__(self, name, rng):
+        self.name = name
+        self.rng = rng
+        self._buffers = {}
+
+    def reseed(self, rng):
+        self.rng = rng
+        self._buffers.clear()
+
+    def randint(self, a, b):
+        round_ = _round.get()
+        if round_ is not None and round_.replies is not None:
+            number = round_._numbers.popleft()
+        elif b - a >= _BUFFERED_RANGE:
+            number = self.rng.randint(a, b)
+        else:
+            buffer = self._buffers.get((a, b))
+            if not buffer:
+                buffer = self._buffers[(a, b)] = self.rng.choices(range(a, b + 1), k=BUFFER)
+            number = buffer.pop()
+        if round_ is not None:
+            round_.numbers.append(number)
+        return number
+
+    def choice(self, seq):
+        return seq[self.randint(0, len(seq) - 1)]
+
+    def shuffle(self, x):
+        """Shuffles a card array in place."""
+        round_ = _round.get()
+        if round_ is not None and round_.replies is not None:
+            x[:] = array('B', round_._shuffles.popleft())
+        else:
+            self.rng.shuffle(x)
+        if round_ is not None:
+            round_.shuffles.append(bytes(x))
+
+
+class RandomService:
+    """Hands out a Stream per game, so games never share one generator.
+
+    By default every stream is a Mersenne Twister seeded from the operating system.
+    Secure streams draw every number from the operating system instead, which is slower
+    but can not be predicted from earlier results. A seed makes every stream
+    deterministic, for benchmarks and simulations: each one is seeded from the seed and its
+    name, so adding a game does not change the numbers of the others.
+
+    configure reseeds streams in place, so a Stream kept by a game stays valid.
+
+    While a round is active, every number and shuffle a stream hands out is recorded in
+    the round, so rounds can be replayed in every mode.
+    """
+
+    __slots__ = ('seed', 'secure', '_streams')
+
+    def __init__(self):
+        self.seed = None
+        self.secure = False
+        self._streams = {}
+
+    def _source(self, name):
+        if self.seed is not None:
+            return random.Random("{}:{}".format(self.seed, name))
+        if self.secure:
+            return random.SystemRandom()
+        return random.Random()
+
+    def stream(self, name):
+        try:
+            return self._streams[name]
+        except KeyError:
+            pass
+        stream = self._streams[name] = Stream(name, self._source(name))
+        return stream
+
+    def configure(self, seed=None, secure=False):
+        """
+
+        :param seed: int, str or None
+            Seeds every stream deterministically. Takes precedence over secure.
+        :param secure: bool
+            Draws every number from the operating system.
+        :return: None
+        """
+        self.seed = seed
+        self.secure = secure
+        for name, stream in self._streams.items():
+            stream.reseed(self._source(name))
+
+    @staticmethod
+    @contextmanager
+    def round(numbers=None, shuffles=None, replies=None):
+        """
+
+        :param numbers: List of int or None
+            The recorded numbers of a round being replayed.
+        :param shuffles: List of bytes or None
+            The recorded shuffles of a round being replayed.
+        :param replies: List of str or None
+            The recorded choices of a round being replayed. The round is a replay when
+            they are given.
+        :return: Round
+
+        Records everything the streams hand out in a new Round until the block exits. The
+        round only applies to the current task.
+        """
+        token = _round.set(Round(numbers, shuffles, replies))
+        try:
+            yield _round.get()
+        finally:
+            _round.reset(token)
+
+    @staticmethod
+    def current():
+        return _round.get()
+
+    @staticmethod
+    def replaying():
+        round_ = _round.get()
+        return round_ is not None and round_.replies is not None
+
+
+rng = RandomService()
@@ -0,0 +1,183 @@
+# Standard Library
+import os
+import struct
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Record types of the session log.
+OPEN, STEP, CLOSE = range(1, 4)
+
+# type, session id, guild id (0 outside a guild), player id, stake, payload length. The
+# guild is kept in global mode as well, since the stake is refunded to the member.
+_HEADER = struct.Struct("<BQQQqH")
+_LENGTH = struct.Struct("<H")
+
+Session = namedtuple("Session", "key scope player stake payload")
+
+
+def pack(*parts):
+    """Packs byte strings, such as card arrays, into one length prefixed payload."""
+    return b"".join(_LENGTH.pack(len(part)) + bytes(part) for part in parts)
+
+
+def unpack(payload):
+    parts = []
+    offset = 0
+    while offset < len(payload):
+        size, = _LENGTH.unpack_from(payload, offset)
+        offset += _LENGTH.size
+        parts.append(payload[offset:offset + size])
+        offset += size
+    return parts
+
+
+def _lock(fd):
+    """Locks an open log for its owner. False when another open log holds the lock."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _parse(data):
+    sessions = {}
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        kind, key, scope, player, stake, size = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        payload = data[offset:offset + size]
+        if len(payload) < size:
+            # The last record was cut off while being written.
+            break
+        offset += size
+        if kind == OPEN:
+            sessions[key] = Session(key, scope or None, player, stake, b"")
+        elif kind == STEP and key in sessions:
+            sessions[key] = sessions[key]._replace(stake=stake, payload=payload)
+        elif kind == CLOSE:
+            sessions.pop(key, None)
+    return list(sessions.values())
+
+
+class SessionLog:
+    """Append-only binary log of the games in progress.
+
+    A session is opened once a bet is withdrawn and closed once the game has paid out.
+    Games checkpoint a step whenever the amount owed to the player if the game were cut
+    short changes, along with the deck and hands in a packed payload. Every record is a
+    single short write to a file opened for appending, so checkpointing a step costs far
+    less than rewriting a Config document.
+
+    Every loaded instance of the cog logs to a file of its own, locked for as long as it
+    is open. After a reload, the instance that was unloaded keeps its log until its last
+    game has closed, while the new one recovers only the logs nobody holds any more. Their
+    sessions were interrupted when the bot stopped, and recover returns them so their
+    stake can be refunded. A log is emptied whenever none of its games are in progress,
+    so it only ever holds the games of the moment.
+    """
+
+    __slots__ = ('path', 'open_sessions', '_fd', '_detached')
+
+    def __init__(self):
+        self.path = None
+        self.open_sessions = {}
+        self._fd = None
+        self._detached = False
+
+    def attach(self, folder):
+        """Starts logging to a new file in folder. Until then, records are dropped."""
+        os.makedirs(str(folder), exist_ok=True)
+        self.path = os.path.join(str(folder), "{}.log".format(os.urandom(8).hex()))
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        _lock(self._fd)
+
+    def _write(self, kind, key, scope, player, stake, payload=b""):
+        if self._fd is None:
+            return
+        os.write(self._fd, _HEADER.pack(kind, key, scope or 0, player, int(stake), len(payload))
+                 + payload)
+
+    def open(self, ctx, stake):
+        scope = ctx.guild.id if ctx.guild else None
+        self.open_sessions[ctx.message.id] = stake
+        self._write(OPEN, ctx.message.id, scope, ctx.author.id, stake)
+
+    def step(self, ctx, *parts, stake=None):
+        """
+
+        :param ctx: Context object
+            The context of the game.
+        :param parts: bytes
+            The state of the game, such as the deck and the hands.
+        :param stake: int or None
+            What the player is owed if the game stops here. None keeps the last stake.
+        :return: None
+
+        Checkpoints a game in progress.
+        """
+        key = ctx.message.id
+        if key not in self.open_sessions:
+            return
+        if stake is None:
+            stake = self.open_sessions[key]
+        self.open_sessions[key] = stake
+        self._write(STEP, key, 0, ctx.author.id, stake, pack(*parts))
+
+    def close(self, ctx):
+        """Settles a session. Called before the payout, so a crash can never pay twice."""
+        if self.open_sessions.pop(ctx.message.id, None) is None:
+            return
+        self._write(CLOSE, ctx.message.id, 0, ctx.author.id, 0)
+        if not self.open_sessions and self._fd is not None:
+            if self._detached:
+                self._release()
+            else:
+                os.ftruncate(self._fd, 0)
+
+    def recover(self):
+        """
+
+        :return: List of Sessions
+            The sessions that were never closed, with their last checkpointed stake.
+
+        Reads the logs next to this one that no running instance holds, and deletes them.
+        """
+        if self.path is None:
+            return []
+        folder = os.path.dirname(self.path)
+        sessions = []
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if path == self.path or not name.endswith(".log"):
+                continue
+            with open(path, "rb") as f:
+                if not _lock(f.fileno()):
+                    continue
+                sessions.extend(_parse(f.read()))
+            os.remove(path)
+        return sessions
+
+    def detach(self):
+        """Stops logging once the games in progress have closed."""
+        self._detached = True
+        if not self.open_sessions:
+            self._release()
+
+    def _release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            os.remove(self.path)
+            self._fd = None
+        self.path = None
+
+
+sessions = SessionLog()
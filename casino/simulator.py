@@ -0,0 +1,309 @@
+# Standard Library
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Casino
+from .deck import Deck, HandValue
+from .evaluator import HANDS, evaluate
+from .odds import best_option
+
+# Share of a shoe dealt before the cut card comes out.
+PENETRATION = 0.75
+
+Report = namedtuple("Report", "game strategy multiplier rounds rtp variance hit_rate break_even")
+
+# Every simulated round returns (win, scaled, fixed) for a bet of one credit.
+# scaled is the amount the engine multiplies by the game's Multiplier setting
+# before depositing it, fixed is paid back as is (pushes, Allin, Double and
+# Pikapokeri winnings). Keeping them apart lets one run report the return for
+# any multiplier without playing the rounds again. A round that raises its bet
+# appends the credits wagered in total (Blackjack doubles).
+
+
+def _roll(rng):
+    return rng.randint(1, 6), rng.randint(1, 6)
+
+
+def _allin(rng, deck, arg):
+    multiplier = int(arg or 2)
+    if rng.randint(0, multiplier + 1) == 0:
+        return True, 0, multiplier
+    return False, 0, 0
+
+
+def _coin(rng, deck, arg):
+    win = rng.randint(0, 1) == 0
+    return win, win, 0
+
+
+def _cups(rng, deck, arg):
+    win = rng.randint(1, 3) == 1
+    return win, win, 0
+
+
+def _dice(rng, deck, arg):
+    win = sum(_roll(rng)) in (2, 7, 11, 12)
+    return win, win, 0
+
+
+def _hilo(rng, deck, arg):
+    result = sum(_roll(rng))
+    if arg == "low":
+        win = result < 7
+    elif arg == "high":
+        win = result > 7
+    else:
+        win = result == 7
+    if not win:
+        return False, 0, 0
+    return True, 5 if result == 7 else 1, 0
+
+
+def _craps(rng, deck, arg):
+    result = sum(_roll(rng))
+    if result == 7:
+        return True, 3, 0
+    elif result == 11:
+        return True, 1, 0
+    elif result in (2, 3, 12):
+        return False, 0, 0
+    win = sum(_roll(rng)) == result
+    return win, win, 0
+
+
+def _bj_stay(count, soft, up, first):
+    return "stay"
+
+
+def _bj_dealer(count, soft, up, first):
+    return "hit" if count < 16 else "stay"
+
+
+def _bj_basic(count, soft, up, first):
+    if first and (count == 11 or count == 10 and up < 10):
+        return "double"
+    if soft:
+        return "hit" if count < 18 else "stay"
+    if count >= 17 or count >= 13 and up < 7 or count == 12 and 3 < up < 7:
+        return "stay"
+    return "hit"
+
+
+BLACKJACK = {"stay": _bj_stay, "dealer": _bj_dealer, "basic": _bj_basic}
+
+
+def _dealer(deck, dh):
+    value = HandValue(dh)
+    if value.ace and value.count != 21:
+        value.add(deck.draw())
+    while value.count < 16:
+        value.add(deck.draw())
+    return value.count
+
+
+def _blackjack(rng, deck, arg):
+    decide = BLACKJACK[arg or "basic"]
+    ph = HandValue(deck.deal(num=2))
+    dh = deck.deal(num=2)
+    up = deck.bj_count(dh, hole=True)
+    amount = 1
+
+    if ph.count != 21:
+        choice = decide(ph.count, ph.soft, up, True)
+        if choice == "double":
+            ph.add(deck.draw())
+            amount = 2
+        while choice == "hit":
+            ph.add(deck.draw())
+            if ph.count >= 21:
+                break
+            choice = decide(ph.count, ph.soft, up, False)
+        dc = _dealer(deck, dh)
+    else:
+        dc = deck.bj_count(dh)
+    pc = ph.count
+    if dc > 21 >= pc or dc < pc <= 21:
+        return True, amount, 0, amount
+    elif dc == pc <= 21:
+        return False, 0, amount, amount
+    return False, 0, 0, amount
+
+
+def _war(rng, deck, arg):
+    pc, dc = (deck.war_count(x) for x in deck.deal(num=2))
+    if pc == dc:
+        if arg == "surrender":
+            return False, 0, 0
+        deck.burn(3)
+        pc, dc = (deck.war_count(x) for x in deck.deal(num=2))
+    win = pc >= dc
+    return win, win, 0
+
+
+def _double(rng, deck, arg):
+    amount = 1
+    for x in range(int(arg or 1)):
+        if rng.randint(0, 1) == 0:
+            return False, 0, 0
+        amount *= 2
+    return True, 0, amount
+
+
+def _pp_first(hand, op1, op2):
+    return 1
+
+
+def _pp_pair(hand, op1, op2):
+    ranks = Deck.ranks_of(hand)
+    if op1 >> 2 in ranks:
+        return 1
+    if op2 >> 2 in ranks:
+        return 2
+    return 1 if op1 >> 2 >= op2 >> 2 else 2
+
+
+PIKAPOKERI = {"best": best_option, "first": _pp_first, "pair": _pp_pair}
+
+
+def _pikapokeri(rng, deck, arg):
+    choice, _, doubles = (arg or "best").partition(":")
+    ph = deck.deal(num=2)
+    op1 = deck.deal(num=1)
+    op2 = deck.deal(num=1)
+    ph += op1 if PIKAPOKERI[choice](ph, op1[0], op2[0]) == 1 else op2
+    ph += deck.deal(num=2)
+    amount = HANDS[evaluate(ph)][0]
+    win = amount > 0
+
+    # The double-up (tuplaa) is only offered when the hand paid more than the bet.
+    if amount > 1:
+        for x in range(int(doubles or 0)):
+            deck.shuffle()
+            card = deck.deal(num=1)
+            picks = [deck.deal(num=1) for y in range(4)]
+            pick = picks[rng.randrange(4)]
+            if deck.war_count(card[0]) < deck.war_count(pick[0]):
+                amount *= 2
+            else:
+                win = False
+                amount = 0
+                break
+    return win, 0, amount
+
+
+GAMES = {
+    "Allin": (_allin, "2"),
+    "Blackjack": (_blackjack, "basic"),
+    "Coin": (_coin, None),
+    "Craps": (_craps, None),
+    "Cups": (_cups, None),
+    "Dice": (_dice, None),
+    "Double": (_double, "1"),
+    "Hilo": (_hilo, "low"),
+    "Pikapokeri": (_pikapokeri, "best:0"),
+    "War": (_war, "war"),
+}
+
+
+class Tally:
+    """Running sums for one game, mergeable across shards.
+
+    The return of a round for multiplier m is m * scaled + fixed, so keeping the
+    sums of both parts, their squares and their product is enough to report the
+    exact mean and variance for any multiplier. The return to player and the
+    break-even multiplier are per credit wagered, the variance is per round.
+    """
+
+    __slots__ = ("rounds", "wagered", "hits", "scaled", "scaled2", "fixed", "fixed2", "cross")
+
+    def __init__(self):
+        self.rounds = 0
+        self.wagered = 0
+        self.hits = 0
+        self.scaled = 0
+        self.scaled2 = 0
+        self.fixed = 0
+        self.fixed2 = 0
+        self.cross = 0
+
+    def add(self, win, scaled, fixed, wagered=1):
+        self.rounds += 1
+        self.wagered += wagered
+        self.hits += win
+        self.scaled += scaled
+        self.scaled2 += scaled * scaled
+        self.fixed += fixed
+        self.fixed2 += fixed * fixed
+        self.cross += scaled * fixed
+
+    def merge(self, other):
+        for attr in self.__slots__:
+            setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+        return self
+
+    def report(self, game, strategy, multiplier):
+        n = self.rounds or 1
+        wagered = self.wagered or 1
+        m = 1 if multiplier is None else multiplier
+        total = m * self.scaled + self.fixed
+        mean = total / n
+        square = (m * m * self.scaled2 + 2 * m * self.cross + self.fixed2) / n
+        break_even = (wagered - self.fixed) / self.scaled if self.scaled else None
+        return Report(game, strategy, multiplier, self.rounds, total / wagered,
+                      square - mean * mean, self.hits / n, break_even)
+
+
+def _run_shard(game, strategy, rounds, seed, decks=None):
+    play, default = GAMES[game]
+    rng = random.Random(seed)
+    tally = Tally()
+    if decks:
+        # A shoe is dealt across rounds and only reshuffled between them, once the cut
+        # card has come out.
+        deck = Deck(rng, decks=decks, penetration=PENETRATION)
+        deck.new()
+        for x in range(rounds):
+            deck.next_round()
+            tally.add(*play(rng, deck, strategy or default))
+        return tally
+
+    deck = Deck(rng)
+    for x in range(rounds):
+        # Every game session deals from a freshly shuffled deck of its own. Carrying a
+        # deck over between rounds would let Deck._check swap in a new deck mid-hand.
+        deck.new()
+        tally.add(*play(rng, deck, strategy or default))
+    return tally
+
+
+def simulate(game, rounds, strategy=None, multipliers=(None,), workers=None, seed=None,
+             decks=None):
+    """Plays rounds of a game headless and returns a Report for each multiplier.
+
+    The rounds are split into one shard per worker process. Each shard shuffles its decks
+    with its own seeded generator, so a run with the same seed and worker count is
+    reproducible. With decks, every shard deals from a shoe of that many decks instead of
+    a fresh deck per round.
+    """
+    game = game.title()
+    if game not in GAMES:
+        raise KeyError(game)
+    strategy = strategy or GAMES[game][1]
+    workers = max(1, min(workers or os.cpu_count() or 1, rounds))
+    sizes = [rounds // workers + (x < rounds % workers) for x in range(workers)]
+    seeder = random.Random(seed)
+    seeds = [seeder.getrandbits(64) for x in sizes]
+
+    if workers == 1:
+        tallies = [_run_shard(game, strategy, sizes[0], seeds[0], decks)]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            tallies = list(pool.map(_run_shard, [game] * workers, [strategy] * workers,
+                                    sizes, seeds, [decks] * workers))
+
+    tally = Tally()
+    for shard in tallies:
+        tally.merge(shard)
+    return [tally.report(game, strategy, m) for m in multipliers]
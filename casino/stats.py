@@ -0,0 +1,177 @@
+# Standard Library
+import time
+from array import array
+
+# Third-Party Libraries
+from sortedcontainers import SortedList
+
+STATS = ("Played", "Won")
+METRICS = ("played", "won", "winrate")
+
+# Events older than this are dropped from the log when it is compacted.
+RETENTION = 7 * 24 * 3600
+
+
+class ScopeStats:
+    """Played and Won counters of every player in one scope, stored by column.
+
+    Every game has a Played and a Won column, an array with one slot per player. A player
+    gets a row the first time they are seen, and keeps it. Every increment is also
+    appended to an event log of (time, row, game, stat, count), so counts over a recent
+    window can be read without a per player history.
+
+    Rows changed since the last compaction are kept in dirty, so only their totals are
+    written back to the player documents.
+
+    Rankings are sorted lists of players who have played, keyed by (game, metric) where a
+    game of None ranks all games together. A ranking is built the first time it is asked
+    for and then kept up to date by every increment, so top and rank are O(log n).
+    """
+
+    __slots__ = ('games', 'index', 'rows', 'ids', 'columns', 'dirty', 'times', 'events',
+                 'counts', 'rankings')
+
+    def __init__(self, games):
+        self.games = tuple(games)
+        self.index = {game: idx for idx, game in enumerate(self.games)}
+        self.rows = {}
+        self.ids = array('Q')
+        self.columns = {(stat, game): array('Q') for stat in STATS for game in self.games}
+        self.dirty = set()
+        self.times = array('d')
+        self.events = array('Q')
+        self.counts = array('L')
+        self.rankings = {}
+
+    def row(self, player_id):
+        try:
+            return self.rows[player_id]
+        except KeyError:
+            pass
+        row = self.rows[player_id] = len(self.ids)
+        self.ids.append(player_id)
+        for column in self.columns.values():
+            column.append(0)
+        return row
+
+    def load(self, player_id, data):
+        row = self.row(player_id)
+        for (stat, game), column in self.columns.items():
+            column[row] = data[stat][game]
+
+    def record(self, player_id, stat, game, count=1, now=None):
+        """Adds count to a player's stat for a game."""
+        row = self.row(player_id)
+        rankings = self._unrank(row, (game, None))
+        self.columns[(stat, game)][row] += count
+        self._rank(row, rankings)
+        self.dirty.add(row)
+        self.times.append(time.time() if now is None else now)
+        self.events.append(row << 5 | self.index[game] << 1 | STATS.index(stat))
+        self.counts.append(count)
+
+    def totals(self, player_id):
+        """Returns the player's Played and Won dictionaries."""
+        row = self.rows.get(player_id)
+        return tuple({game: 0 if row is None else self.columns[(stat, game)][row]
+                      for game in self.games} for stat in STATS)
+
+    def window(self, player_id, seconds, now=None):
+        """Returns the player's Played and Won dictionaries for the last seconds."""
+        result = tuple(dict.fromkeys(self.games, 0) for stat in STATS)
+        row = self.rows.get(player_id)
+        if row is None:
+            return result
+        since = (time.time() if now is None else now) - seconds
+        for idx in range(len(self.times) - 1, -1, -1):
+            if self.times[idx] < since:
+                break
+            event = self.events[idx]
+            if event >> 5 == row:
+                result[event & 1][self.games[event >> 1 & 15]] += self.counts[idx]
+        return result
+
+    def reset(self, player_id):
+        row = self.rows.get(player_id)
+        if row is None:
+            return
+        rankings = self._unrank(row, (None,) + self.games)
+        for column in self.columns.values():
+            column[row] = 0
+        self.dirty.discard(row)
+        self._rank(row, rankings)
+
+    def compact(self, now=None):
+        """Returns the (player id, Played, Won) rows to write back and trims the log.
+
+        The rows are no longer dirty afterwards. Rows that could not be written are passed
+        to restore.
+        """
+        changed = []
+        for row in self.dirty:
+            player_id = self.ids[row]
+            changed.append((player_id, *self.totals(player_id)))
+        self.dirty.clear()
+
+        since = (time.time() if now is None else now) - RETENTION
+        keep = next((idx for idx, x in enumerate(self.times) if x >= since), len(self.times))
+        if keep:
+            del self.times[:keep]
+            del self.events[:keep]
+            del self.counts[:keep]
+        return changed
+
+    def restore(self, player_ids):
+        """Marks players dirty again, so the next compaction returns them."""
+        self.dirty.update(self.rows[x] for x in player_ids)
+
+    def _counts(self, row, game):
+        if game is None:
+            return tuple(sum(self.columns[(stat, x)][row] for x in self.games) for stat in STATS)
+        return tuple(self.columns[(stat, game)][row] for stat in STATS)
+
+    def _key(self, row, game, metric):
+        played, won = self._counts(row, game)
+        if metric == "played":
+            return -played, self.ids[row]
+        elif metric == "won":
+            return -won, self.ids[row]
+        return -(won / played if played else 0), -played, self.ids[row]
+
+    def _unrank(self, row, games):
+        rankings = [(game, metric, ranking) for (game, metric), ranking in self.rankings.items()
+                    if game in games]
+        for game, metric, ranking in rankings:
+            ranking.discard(self._key(row, game, metric))
+        return rankings
+
+    def _rank(self, row, rankings):
+        for game, metric, ranking in rankings:
+            if self._counts(row, game)[0]:
+                ranking.add(self._key(row, game, metric))
+
+    def ranking(self, game, metric):
+        """Returns the SortedList ranking players of a game, or of all games when None."""
+        try:
+            return self.rankings[(game, metric)]
+        except KeyError:
+            pass
+        ranking = self.rankings[(game, metric)] = SortedList(
+            self._key(row, game, metric) for row in range(len(self.ids))
+            if self._counts(row, game)[0])
+        return ranking
+
+    def top(self, game, metric, count):
+        """Returns (player id, played, won) of the best count players."""
+        result = []
+        for key in self.ranking(game, metric)[:count]:
+            row = self.rows[key[-1]]
+            result.append((key[-1], *self._counts(row, game)))
+        return result
+
+    def rank(self, player_id, game, metric):
+        """Returns the position of a player counting from 1, or None if they have not played."""
+        row = self.rows.get(player_id)
+        if row is None or not self._counts(row, game)[0]:
+            return None
+        return self.ranking(game, metric).index(self._key(row, game, metric)) + 1
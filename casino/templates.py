@@ -0,0 +1,103 @@
+# Standard Library
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+# Red
+from redbot.core import bank
+from redbot.core.i18n import Translator, get_locale
+
+_ = Translator("Casino", __file__)
+
+# Seconds a guild's currency name is reused before bank is asked again.
+CURRENCY_TTL = 300
+
+Strings = namedtuple("Strings", "hand hand_title deck_footer bj_start bj_after pp_hand pp_footer "
+                                "pp_result pp_result_of pp_options pp_double pp_batch "
+                                "pp_batch_total balance title won lost")
+Result = namedtuple("Result", "title balance won lost")
+
+
+@lru_cache(maxsize=8)
+def strings(locale):
+    """The translated format strings of the game screens, looked up once per locale."""
+    return Strings(
+        hand=_("{}\n**Score:** {}"),
+        hand_title=_("{}'s Hand"),
+        deck_footer=_("Cards in Deck: {}"),
+        bj_start=_("**Options:** hit, stay, or double"),
+        bj_after=_("**Options:** hit or stay"),
+        pp_hand=_("{}n käsi"),
+        pp_footer=_("\nKortteja pakassa: {}"),
+        pp_result=_("\nTulos"),
+        pp_result_of=_("\nTulos {}"),
+        pp_options=_("\nVaihtoehdot"),
+        pp_double=_("\nTuplaa"),
+        pp_batch=_("{}n kädet ({})"),
+        pp_batch_total=_("Panokset {} kolikkoa, voitot {} kolikkoa"),
+        balance=_("**Remaining Balance:** {} {}"),
+        title=_("{} Casino | {}"),
+        won=_("Congratulations, you just won {} {} {}!\n{}"),
+        lost=_("Sorry, you didn't win anything.\n{}"),
+    )
+
+
+def current():
+    return strings(get_locale())
+
+
+def _escape(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+@lru_cache(maxsize=256)
+def result(locale, casino_name, game, currency):
+    """
+
+    :param locale: str
+    :param casino_name: str
+    :param game: str
+    :param currency: str
+    :return: Result
+
+    The result screen of a game with everything but the amounts filled in. The key holds
+    every static part, so a renamed casino or currency simply compiles a new template.
+    """
+    text = strings(locale)
+    currency = _escape(currency)
+    return Result(
+        title=text.title.format(casino_name, game),
+        balance=text.balance.format("{}", currency),
+        won=text.won.format("{}", currency, "{}", "{}"),
+        lost=text.lost,
+    )
+
+
+class CurrencyNames:
+    """Currency names by guild, kept for CURRENCY_TTL seconds.
+
+    Bank does not announce a renamed currency, so an entry simply expires and the
+    next result screen asks bank again.
+    """
+
+    __slots__ = ('_names',)
+
+    def __init__(self):
+        self._names = {}
+
+    async def get(self, guild):
+        key = guild.id if guild is not None else None
+        now = time.monotonic()
+        try:
+            name, expires = self._names[key]
+        except KeyError:
+            pass
+        else:
+            if now < expires:
+                return name
+        name = await bank.get_currency_name(guild)
+        self._names[key] = (name, now + CURRENCY_TTL)
+        return name
+
+
+currency = CurrencyNames()
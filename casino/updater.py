@@ -0,0 +1,162 @@
+# Standard Library
+import asyncio
+import heapq
+from collections import namedtuple
+
+Tier = namedtuple("Tier", "name access credits role dos")
+
+# Role id of a membership whose role does not exist in the guild. No member has it.
+_MISSING_ROLE = 0
+
+
+class MembershipQueue:
+    """Players waiting for their membership to be re-evaluated.
+
+    Players are queued when something that decides their membership changes: their
+    balance after a game, their roles, or the day they pass the days of service needed
+    for a membership. Players are keyed like cached player records, (scope, player id),
+    so a player queued many times during the debounce is still re-evaluated once.
+
+    Scopes whose memberships were created, edited or deleted are queued for a full
+    sweep of their players.
+    """
+
+    __slots__ = ('pending', 'sweeps', 'timers', '_heap', '_event')
+
+    def __init__(self):
+        self.pending = {}
+        self.sweeps = set()
+        self.timers = {}
+        self._heap = []
+        self._event = None
+
+    def schedule(self, scope, user):
+        self.pending[(scope, user.id)] = user
+        self._wake()
+
+    def schedule_at(self, when, scope, user):
+        """Queues a player once the event loop clock reaches when."""
+        key = (scope, user.id)
+        if key in self.timers and self.timers[key][0] <= when:
+            return
+        self.timers[key] = (when, user)
+        heapq.heappush(self._heap, (when, key))
+        self._wake()
+
+    def refresh(self, scope):
+        self.sweeps.add(scope)
+        self._wake()
+
+    def _wake(self):
+        if self._event is not None:
+            self._event.set()
+
+    def _release_due(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            when, key = heapq.heappop(self._heap)
+            # Timers that were replaced by an earlier one are left in the heap.
+            if self.timers.get(key, (None,))[0] == when:
+                self.pending[key] = self.timers.pop(key)[1]
+
+    async def wait(self, debounce, until):
+        """
+
+        :param debounce: int
+            Seconds to keep collecting once work has arrived.
+        :param until: float
+            Event loop time at which to stop waiting even if nothing was queued.
+        :return: Tuple
+            The queued players keyed by (scope, player id), and the scopes to sweep.
+
+        Waits for players or sweeps to be queued. Work that arrives during the debounce
+        is returned in the same batch.
+        """
+        loop = asyncio.get_event_loop()
+        if self._event is None:
+            self._event = asyncio.Event()
+
+        while True:
+            self._event.clear()
+            now = loop.time()
+            self._release_due(now)
+            if self.pending or self.sweeps or now >= until:
+                break
+            timeout = min(self._heap[0][0], until) if self._heap else until
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout - now)
+            except asyncio.TimeoutError:
+                pass
+
+        if self.pending or self.sweeps:
+            await asyncio.sleep(debounce)
+            self._release_due(loop.time())
+        batch, self.pending = self.pending, {}
+        sweeps, self.sweeps = self.sweeps, set()
+        return batch, sweeps
+
+    def clear(self):
+        self.pending.clear()
+        self.sweeps.clear()
+        self.timers.clear()
+        self._heap.clear()
+
+
+class MembershipIndex:
+    """Memberships compiled for qualification, per scope.
+
+    A scope's memberships become a tuple of Tiers sorted from the highest access down,
+    with role names resolved to role ids once. The first tier a player meets is then the
+    membership with the highest access they qualify for. Ties keep the order of the
+    memberships, the same as taking max() over them.
+
+    Compiled tiers must be invalidated when the memberships of a scope or the roles of
+    its guild change.
+    """
+
+    __slots__ = ('_tiers',)
+
+    def __init__(self):
+        self._tiers = {}
+
+    def get(self, scope, memberships, guild=None):
+        """
+
+        :param scope: None or guild id
+        :param memberships: Dictionary
+            The memberships of the scope.
+        :param guild: Guild object or None
+            The guild whose roles memberships require. In global mode roles are ignored.
+        :return: Tuple of Tiers
+        """
+        try:
+            return self._tiers[scope]
+        except KeyError:
+            pass
+        roles = {x.name: x.id for x in guild.roles} if guild is not None else None
+        tiers = []
+        for name, requirements in memberships.items():
+            role = requirements['Role']
+            if roles is None or not role:
+                role = None
+            else:
+                role = roles.get(role, _MISSING_ROLE)
+            tiers.append(Tier(name, requirements['Access'], requirements['Credits'] or 0, role,
+                              requirements['DOS'] or 0))
+        tiers.sort(key=lambda x: -x.access)
+        tiers = self._tiers[scope] = tuple(tiers)
+        return tiers
+
+    @staticmethod
+    def qualify(tiers, bal, roles, days):
+        """Returns the name of the highest membership met, or Basic."""
+        for tier in tiers:
+            if (bal >= tier.credits and days >= tier.dos and
+                    (tier.role is None or tier.role in roles)):
+                return tier.name
+        return "Basic"
+
+    def invalidate(self, scope):
+        self._tiers.pop(scope, None)
+
+    def clear(self):
+        self._tiers.clear()
@@ -0,0 +1,34 @@
+# Standard Library
+from itertools import combinations
+
+# Casino
+from casino.evaluator import HANDS, NOTHING, STRAIGHT, evaluate
+
+
+def _card(rank, suit=0):
+    return rank << 2 | suit
+
+
+def _low_pair_span(hand):
+    """The hands the old check_hand paid as Suora: a pair below tens within a five span."""
+    ranks = [x >> 2 for x in hand]
+    pairs = [x for x in set(ranks) if ranks.count(x) == 2]
+    return (len(set(ranks)) == 4 and max(ranks) - min(ranks) == 4 and len(pairs) == 1 and
+            pairs[0] < 8 and len({x & 3 for x in hand}) > 1)
+
+
+def test_low_pair_span_is_not_a_straight():
+    hand = [_card(0), _card(1), _card(1, 1), _card(2, 2), _card(4, 3)]
+    assert evaluate(hand) == NOTHING
+    assert HANDS[evaluate(hand)][0] == 0
+
+
+def test_straight():
+    hand = [_card(x, x & 3) for x in range(8, 13)]
+    assert evaluate(hand) == STRAIGHT
+
+
+def test_low_pair_span_count():
+    changed = [x for x in combinations(range(52), 5) if _low_pair_span(x)]
+    assert len(changed) == 27648
+    assert all(evaluate(list(x)) == NOTHING for x in changed)